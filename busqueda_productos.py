@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+# Archivo: busqueda_productos.py
+
+import heapq
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import Counter
+
+_NO_ALFANUMERICO = re.compile(r"[^0-9a-z]+")
+_FIN_PREFIJO = "\uffff"
+TAM_NGRAMA = 3
+
+
+def normalizar(texto):
+    """Pasa el texto a minúsculas sin acentos y con solo letras y dígitos separados por espacios."""
+    texto = str(texto).casefold()
+    if not texto.isascii():
+        # NFKD separa las marcas de acento, que se descartan al pasar a ASCII.
+        texto = unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode("ascii")
+    return _NO_ALFANUMERICO.sub(" ", texto).strip()
+
+
+def ngramas(texto_normalizado):
+    relleno = f" {texto_normalizado} "
+    return {relleno[i:i + TAM_NGRAMA] for i in range(len(relleno) - TAM_NGRAMA + 1)}
+
+
+class IndiceProductos:
+    """Índice de búsqueda sobre nombres e ids de productos.
+
+    `buscar` regresa posiciones dentro de la secuencia de productos original,
+    ordenadas por relevancia: id exacto, nombre que empieza con la consulta,
+    todas las palabras encontradas por prefijo en el nombre o en el id (así "12"
+    encuentra el producto 123) y, si nada coincide, similitud por n-gramas
+    (tolera errores de dedo y búsquedas a mitad de palabra).
+    """
+
+    def __init__(self, productos):
+        self._nombres = []
+        self._por_id = {}
+        por_token = {}
+        for i, p in enumerate(productos):
+            nombre = normalizar(p["nombre"])
+            self._nombres.append(nombre)
+            self._por_id.setdefault(p["id"], i)
+            # El id se indexa como una palabra más para buscarlo también por prefijo.
+            for token in set(nombre.split()) | {normalizar(p["id"])}:
+                por_token.setdefault(token, []).append(i)
+        self._tokens = sorted(por_token)
+        self._posiciones = [por_token[t] for t in self._tokens]
+        # Los n-gramas se indexan sobre el vocabulario, no sobre cada producto.
+        self._ngramas = {}
+        for num_token, token in enumerate(self._tokens):
+            for ng in ngramas(token):
+                self._ngramas.setdefault(ng, []).append(num_token)
+
+    def __len__(self):
+        return len(self._nombres)
+
+    def posicion(self, producto_id):
+        """Posición del producto con ese id, o None si no existe."""
+        return self._por_id.get(producto_id)
+
+    def _por_prefijo(self, prefijo):
+        inicio = bisect_left(self._tokens, prefijo)
+        fin = bisect_left(self._tokens, prefijo + _FIN_PREFIJO, inicio)
+        encontrados = set()
+        for posiciones in self._posiciones[inicio:fin]:
+            encontrados.update(posiciones)
+        return encontrados
+
+    def _por_similitud(self, token):
+        """Productos cuyo nombre contiene una palabra parecida a `token`, con la mejor similitud de cada uno."""
+        ngramas_token = ngramas(token)
+        coincidencias = Counter()
+        for ng in ngramas_token:
+            coincidencias.update(self._ngramas.get(ng, ()))
+        minimo = max(1, len(ngramas_token) // 2)
+        encontrados = {}
+        for num_token, comunes in coincidencias.items():
+            if comunes < minimo:
+                continue
+            similitud = comunes / len(ngramas_token | ngramas(self._tokens[num_token]))
+            for i in self._posiciones[num_token]:
+                if similitud > encontrados.get(i, 0.0):
+                    encontrados[i] = similitud
+        return encontrados
+
+    def buscar(self, consulta, limite=20):
+        consulta = normalizar(consulta)
+        if not consulta:
+            return list(range(min(limite, len(self._nombres))))
+
+        resultados = []
+        exacto = self._por_id.get(int(consulta)) if consulta.isdigit() else None
+        if exacto is not None:
+            resultados.append(exacto)
+
+        candidatos = None
+        for token in consulta.split():
+            encontrados = self._por_prefijo(token)
+            candidatos = encontrados if candidatos is None else candidatos & encontrados
+            if not candidatos:
+                break
+
+        if candidatos:
+            nombres = self._nombres
+            mejores = heapq.nsmallest(
+                limite, candidatos,
+                key=lambda i: (not nombres[i].startswith(consulta), len(nombres[i]), i)
+            )
+        elif len(consulta) >= TAM_NGRAMA - 1:
+            puntaje = Counter()
+            for token in consulta.split():
+                for i, similitud in self._por_similitud(token).items():
+                    puntaje[i] += similitud
+            mejores = [i for i, _ in heapq.nsmallest(
+                limite, puntaje.items(), key=lambda par: (-par[1], len(self._nombres[par[0]]), par[0])
+            )]
+        else:
+            mejores = []
+
+        resultados.extend(i for i in mejores if i != exacto)
+        return resultados[:limite]
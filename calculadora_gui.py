@@ -1,36 +1,57 @@
 # -*- coding: utf-8 -*-
+import os
 import sys
 import json
+import sqlite3
 from datetime import datetime
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QGridLayout, QFrame, # <-- AÑADE QGridLayout Y QFrame AQUÍ
     QLabel, QComboBox, QRadioButton, QLineEdit, QPushButton,
     QSpinBox, QTableWidget, QTableWidgetItem, QHeaderView, QMessageBox,
-    QDialog, QDialogButtonBox, QFormLayout
+    QDialog, QDialogButtonBox, QFormLayout, QFileDialog, QCompleter, QDoubleSpinBox
+)
+from PyQt6.QtGui import QFont, QIcon, QPixmap, QAction, QStandardItem, QStandardItemModel
+from PyQt6.QtCore import (
+    Qt, QSize, QAbstractListModel, QModelIndex, QObject, QFileSystemWatcher, QTimer, QThreadPool, pyqtSignal
 )
-from PyQt6.QtGui import QFont, QIcon, QPixmap
-from PyQt6.QtCore import Qt, QSize
 
 # --- Importaciones para PDF ---
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.units import inch
 
+from busqueda_productos import IndiceProductos
+from historial_ventas import registrar_cotizacion, nuevo_folio, pedidos_del_dia
+from planeacion_carga import planear_carga, partidas_sin_producto, CAMION_DEFAULT
+from recursos_graficos import ruta_variante, dibujar_logo_pdf
+from exportar_cotizacion import exportar_cotizacion, FORMATOS_EXPORTACION
+
 IVA_FACTOR = 1.16
 JSON_FILE = "productos.json"
+ROL_ID_PRODUCTO = Qt.ItemDataRole.UserRole + 1
+# Espera tras el último aviso de cambio antes de recargar; al guardar llegan varios avisos seguidos.
+RETARDO_RECARGA_MS = 500
+
+def cargar_icono(nombre, tamano):
+    """QIcon con variantes pre-escaladas a 1x y 2x, en lugar del PNG original de cientos de px."""
+    icono = QIcon()
+    for escala in (1, 2):
+        lado = tamano * escala
+        icono.addFile(ruta_variante(nombre, lado, lado), QSize(lado, lado))
+    return icono
 
 # --- VENTANA DE CONFIGURACIÓN DE PRODUCTOS (Sin cambios visuales mayores) ---
 class ConfiguracionDialog(QDialog):
     def __init__(self, productos, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Configuración de Productos")
-        self.setMinimumSize(600, 500)
+        self.setMinimumSize(800, 500)
         self.productos = productos
         
         layout = QVBoxLayout(self)
         self.table = QTableWidget()
-        self.table.setColumnCount(6)
-        self.table.setHorizontalHeaderLabels(["ID", "Nombre", "Piezas", "Costo", "P. Minorista", "PVPS Caja"])
+        self.table.setColumnCount(8)
+        self.table.setHorizontalHeaderLabels(["ID", "Nombre", "Piezas", "Costo", "P. Minorista", "PVPS Caja", "Peso Caja (kg)", "Vol. Caja (m³)"])
         self.table.selectionModel().selectionChanged.connect(self.fila_seleccionada)
         layout.addWidget(self.table)
 
@@ -42,6 +63,11 @@ class ConfiguracionDialog(QDialog):
         self.costo_input = QLineEdit()
         self.minorista_input = QLineEdit()
         self.pvps_input = QLineEdit()
+        # Opcionales: vacíos, el plan de carga los estima con el nombre y las piezas por caja.
+        self.peso_input = QLineEdit()
+        self.peso_input.setPlaceholderText("Estimado")
+        self.volumen_input = QLineEdit()
+        self.volumen_input.setPlaceholderText("Estimado")
 
         form_layout.addRow("ID:", self.id_input)
         form_layout.addRow("Nombre:", self.nombre_input)
@@ -49,6 +75,8 @@ class ConfiguracionDialog(QDialog):
         form_layout.addRow("Costo Distribuidor:", self.costo_input)
         form_layout.addRow("Precio Minorista:", self.minorista_input)
         form_layout.addRow("PVPS Caja:", self.pvps_input)
+        form_layout.addRow("Peso por Caja (kg):", self.peso_input)
+        form_layout.addRow("Volumen por Caja (m³):", self.volumen_input)
         layout.addLayout(form_layout)
         
         buttons_layout = QHBoxLayout()
@@ -82,6 +110,8 @@ class ConfiguracionDialog(QDialog):
             self.table.setItem(row, 3, QTableWidgetItem(str(p["costo_distribuidor_iva"])))
             self.table.setItem(row, 4, QTableWidgetItem(str(p["precio_minorista_iva"])))
             self.table.setItem(row, 5, QTableWidgetItem(str(p["pvps_caja"])))
+            self.table.setItem(row, 6, QTableWidgetItem(str(p.get("peso_caja_kg", ""))))
+            self.table.setItem(row, 7, QTableWidgetItem(str(p.get("volumen_caja_m3", ""))))
 
     def fila_seleccionada(self, selected, deselected):
         if not selected.indexes(): return
@@ -92,6 +122,8 @@ class ConfiguracionDialog(QDialog):
         self.costo_input.setText(self.table.item(row, 3).text())
         self.minorista_input.setText(self.table.item(row, 4).text())
         self.pvps_input.setText(self.table.item(row, 5).text())
+        self.peso_input.setText(self.table.item(row, 6).text())
+        self.volumen_input.setText(self.table.item(row, 7).text())
 
     def limpiar_campos(self):
         self.id_input.clear()
@@ -100,6 +132,8 @@ class ConfiguracionDialog(QDialog):
         self.costo_input.clear()
         self.minorista_input.clear()
         self.pvps_input.clear()
+        self.peso_input.clear()
+        self.volumen_input.clear()
         self.table.clearSelection()
 
     def guardar_producto(self):
@@ -112,6 +146,11 @@ class ConfiguracionDialog(QDialog):
                 "precio_minorista_iva": float(self.minorista_input.text()),
                 "pvps_caja": float(self.pvps_input.text())
             }
+            medidas = {
+                "peso_caja_kg": self.peso_input.text().strip(),
+                "volumen_caja_m3": self.volumen_input.text().strip()
+            }
+            medidas = {campo: float(texto) if texto else None for campo, texto in medidas.items()}
             if not nuevo_prod["nombre"]:
                 QMessageBox.warning(self, "Error", "El nombre no puede estar vacío.")
                 return
@@ -120,16 +159,17 @@ class ConfiguracionDialog(QDialog):
                 prod_id = int(prod_id)
                 for i, p in enumerate(self.productos):
                     if p["id"] == prod_id:
-                        self.productos[i] = {"id": prod_id, **nuevo_prod}
+                        # Se conservan los campos que este diálogo no muestra.
+                        self.productos[i] = con_medidas({**p, "id": prod_id, **nuevo_prod}, medidas)
                         break
             else: # Añadir nuevo
                 new_id = max([p["id"] for p in self.productos] or [0]) + 1
-                self.productos.append({"id": new_id, **nuevo_prod})
+                self.productos.append(con_medidas({"id": new_id, **nuevo_prod}, medidas))
             
             self.cargar_tabla()
             self.limpiar_campos()
         except ValueError:
-            QMessageBox.warning(self, "Error de Formato", "Asegúrese de que los campos de precio y costo sean números válidos.")
+            QMessageBox.warning(self, "Error de Formato", "Asegúrese de que los campos de precio, costo, peso y volumen sean números válidos.")
 
     def eliminar_producto(self):
         selected_rows = self.table.selectionModel().selectedRows()
@@ -144,11 +184,167 @@ class ConfiguracionDialog(QDialog):
         self.limpiar_campos()
 
 
+def con_medidas(producto, medidas):
+    """Aplica el peso y volumen por caja capturados; un campo vacío quita el dato para que se estime."""
+    for campo, valor in medidas.items():
+        if valor is None:
+            producto.pop(campo, None)
+        else:
+            producto[campo] = valor
+    return producto
+
+def fila_combo_producto(producto):
+    fila = QStandardItem(producto["nombre"])
+    fila.setData(producto, Qt.ItemDataRole.UserRole)
+    fila.setData(producto["id"], ROL_ID_PRODUCTO)
+    return fila
+
+def diferencias_catalogo(anteriores, nuevos):
+    """Compara dos listas de productos por id. Regresa (insertados, actualizados, ids_eliminados)."""
+    por_id = {p["id"]: p for p in anteriores}
+    insertados, actualizados = [], []
+    for p in nuevos:
+        anterior = por_id.pop(p["id"], None)
+        if anterior is None:
+            insertados.append(p)
+        elif anterior != p:
+            actualizados.append(p)
+    return insertados, actualizados, list(por_id)
+
+
+# --- RECARGA DEL CATÁLOGO EN SEGUNDO PLANO ---
+class CargadorCatalogo(QObject):
+    """Lee el JSON, calcula las diferencias y arma el índice de búsqueda fuera del hilo de la interfaz."""
+    terminado = pyqtSignal(int, object)
+
+    def cargar(self, solicitud, ruta, anteriores):
+        def tarea():
+            try:
+                with open(ruta, 'r', encoding='utf-8') as f:
+                    nuevos = json.load(f)
+                resultado = (nuevos, diferencias_catalogo(anteriores, nuevos), IndiceProductos(nuevos))
+            except (OSError, json.JSONDecodeError, KeyError, TypeError) as e:
+                # Puede ser un archivo a medio escribir por otra estación; llegará otro aviso al terminar.
+                resultado = e
+            self.terminado.emit(solicitud, resultado)
+        QThreadPool.globalInstance().start(tarea)
+
+
+# --- VENTANAS DEL PLAN DE CARGA ---
+class CamionDialog(QDialog):
+    """Pide la capacidad de los camiones con que se arma el plan."""
+    def __init__(self, camion, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Capacidad del Camión")
+
+        layout = QVBoxLayout(self)
+        form_layout = QFormLayout()
+        self.kg_input = QDoubleSpinBox()
+        self.kg_input.setRange(1.0, 100000.0)
+        self.kg_input.setDecimals(0)
+        self.kg_input.setSuffix(" kg")
+        self.kg_input.setValue(camion["capacidad_kg"])
+        self.m3_input = QDoubleSpinBox()
+        self.m3_input.setRange(0.1, 500.0)
+        self.m3_input.setDecimals(1)
+        self.m3_input.setSuffix(" m³")
+        self.m3_input.setValue(camion["capacidad_m3"])
+        form_layout.addRow("Capacidad de peso:", self.kg_input)
+        form_layout.addRow("Capacidad de volumen:", self.m3_input)
+        layout.addLayout(form_layout)
+
+        self.button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        self.button_box.accepted.connect(self.accept)
+        self.button_box.rejected.connect(self.reject)
+        layout.addWidget(self.button_box)
+
+    def camion(self):
+        kg = self.kg_input.value()
+        return {"nombre": f"Camión {kg / 1000:g} t", "capacidad_kg": kg, "capacidad_m3": self.m3_input.value()}
+
+
+class PlanCargaDialog(QDialog):
+    def __init__(self, plan, camion, sin_producto=(), parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Plan de Carga del Día")
+        self.setMinimumSize(700, 400)
+
+        layout = QVBoxLayout(self)
+        resumen = QLabel(f"{len(plan)} camión(es) de {camion['capacidad_kg']:,.0f} kg / {camion['capacidad_m3']:,.1f} m³")
+        resumen.setObjectName("subtitulo")
+        layout.addWidget(resumen)
+
+        if sin_producto:
+            partidas = ", ".join(f"{cliente} (producto {producto_id}, {cajas} caja(s))" for _folio, cliente, producto_id, cajas in sin_producto)
+            aviso = QLabel(f"No se cargaron {len(sin_producto)} partida(s) de productos que ya no están en el catálogo: {partidas}")
+            aviso.setWordWrap(True)
+            layout.addWidget(aviso)
+
+        self.table = QTableWidget()
+        self.table.setColumnCount(5)
+        self.table.setHorizontalHeaderLabels(["Camión", "Clientes", "Peso (kg)", "Volumen (m³)", "Uso"])
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        for num, camion in enumerate(plan, start=1):
+            row = self.table.rowCount()
+            self.table.insertRow(row)
+            clientes = ", ".join(dict.fromkeys(a["cliente"] for a in camion["articulos"]))
+            self.table.setItem(row, 0, QTableWidgetItem(str(num)))
+            self.table.setItem(row, 1, QTableWidgetItem(clientes))
+            self.table.setItem(row, 2, QTableWidgetItem(f"{camion['peso']:,.1f}"))
+            self.table.setItem(row, 3, QTableWidgetItem(f"{camion['volumen']:,.2f}"))
+            self.table.setItem(row, 4, QTableWidgetItem(f"{max(camion['uso_kg'], camion['uso_m3']):.0%}"))
+        layout.addWidget(self.table)
+
+        self.button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
+        self.button_box.rejected.connect(self.reject)
+        layout.addWidget(self.button_box)
+
+
+# --- MODELO PARA LA BÚSQUEDA DE PRODUCTOS ---
+class ModeloBusquedaProductos(QAbstractListModel):
+    """Expone al QCompleter solo los mejores resultados del índice para el texto escrito."""
+
+    def __init__(self, parent=None, limite=50):
+        super().__init__(parent)
+        self.limite = limite
+        self.productos = []
+        self.indice = IndiceProductos([])
+        self.resultados = []
+
+    def set_productos(self, productos, indice=None):
+        self.beginResetModel()
+        self.productos = productos
+        self.indice = indice or IndiceProductos(productos)
+        self.resultados = []
+        self.endResetModel()
+
+    def buscar(self, texto):
+        self.beginResetModel()
+        self.resultados = self.indice.buscar(texto, self.limite)
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.resultados)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        producto = self.productos[self.resultados[index.row()]]
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            return producto["nombre"]
+        if role == ROL_ID_PRODUCTO:
+            return producto["id"]
+        return None
+
+
 # --- VENTANA PRINCIPAL (CON DISEÑO MEJORADO) ---
 class CalculadoraPreciosApp(QMainWindow):
     def __init__(self):
         super().__init__()
         self.cotizacion_actual = []
+        self.folio_cotizacion = nuevo_folio()
+        self.camion_carga = dict(CAMION_DEFAULT)
         self.productos = self.cargar_productos()
 
         self.setWindowTitle("Sistema de Cotizaciones - Agua de Lourdes")
@@ -172,8 +368,7 @@ class CalculadoraPreciosApp(QMainWindow):
         # Logo
         self.logo_label = QLabel()
         try:
-            pixmap = QPixmap("logo.png")
-            self.logo_label.setPixmap(pixmap.scaled(250, 80, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation))
+            self.logo_label.setPixmap(QPixmap(ruta_variante("logo.png", 250, 80)))
             self.logo_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         except FileNotFoundError:
             print("Advertencia: No se encontró 'logo.png'.")
@@ -185,23 +380,64 @@ class CalculadoraPreciosApp(QMainWindow):
         # Botón de Configuración
         self.config_button = QPushButton(" Configurar Productos")
         try:
-            self.config_button.setIcon(QIcon("config_icon.png"))
+            self.config_button.setIcon(cargar_icono("config_icon.png", 20))
         except FileNotFoundError:
             print("Advertencia: No se encontró 'config_icon.png'.")
         self.config_button.setIconSize(QSize(20, 20))
         self.config_button.clicked.connect(self.abrir_configuracion)
         controles_layout.addWidget(self.config_button)
 
+        # Botón de Plan de Carga
+        self.carga_button = QPushButton(" Planear Carga del Día")
+        try:
+            self.carga_button.setIcon(cargar_icono("truck_icon.png", 20))
+        except FileNotFoundError:
+            print("Advertencia: No se encontró 'truck_icon.png'.")
+        self.carga_button.setIconSize(QSize(20, 20))
+        self.carga_button.clicked.connect(self.abrir_plan_carga)
+        controles_layout.addWidget(self.carga_button)
+
         # Resto de los controles...
         cliente_label = QLabel("Datos de la Cotización")
         cliente_label.setObjectName("titulo")
         self.nombre_cliente_input = QLineEdit()
         self.nombre_cliente_input.setPlaceholderText("Nombre del Cliente")
+        # Con otro cliente el PDF es otra cotización y debe registrarse aparte.
+        self.nombre_cliente_input.textEdited.connect(self.renovar_folio)
         
         product_label = QLabel("Agregar Producto")
         product_label.setObjectName("titulo")
         self.product_combo = QComboBox()
+        self.product_combo.setEditable(True)
+        self.product_combo.setInsertPolicy(QComboBox.InsertPolicy.NoInsert)
+        self.product_combo.lineEdit().setPlaceholderText("Buscar por nombre o ID")
+        self.modelo_busqueda = ModeloBusquedaProductos(self)
+        self.completer_productos = QCompleter(self.modelo_busqueda, self)
+        # El modelo ya viene filtrado y ordenado por el índice; el completer solo lo muestra.
+        self.completer_productos.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        self.completer_productos.activated[QModelIndex].connect(self.seleccionar_producto_buscado)
+        # Va en el lineEdit y no con setCompleter del combo: el combo buscaría la fila activada por
+        # nombre (findText) después de nuestro manejador y con nombres repetidos elegiría otro producto.
+        self.product_combo.lineEdit().setCompleter(self.completer_productos)
+        self.product_combo.lineEdit().textEdited.connect(self.buscar_productos)
         self.actualizar_combo_productos()
+
+        # Recarga automática cuando otra estación modifica el catálogo compartido
+        self.ruta_catalogo = os.path.abspath(JSON_FILE)
+        self.solicitud_recarga = 0
+        self.base_recarga = None
+        self.timer_recarga = QTimer(self)
+        self.timer_recarga.setSingleShot(True)
+        self.timer_recarga.setInterval(RETARDO_RECARGA_MS)
+        self.timer_recarga.timeout.connect(self.recargar_catalogo)
+        self.cargador_catalogo = CargadorCatalogo(self)
+        self.cargador_catalogo.terminado.connect(self.aplicar_recarga)
+        self.watcher_catalogo = QFileSystemWatcher(self)
+        self.watcher_catalogo.addPath(os.path.dirname(self.ruta_catalogo))
+        if os.path.exists(self.ruta_catalogo):
+            self.watcher_catalogo.addPath(self.ruta_catalogo)
+        self.watcher_catalogo.fileChanged.connect(self.programar_recarga)
+        self.watcher_catalogo.directoryChanged.connect(self.vigilar_catalogo)
         
         cantidad_layout = QHBoxLayout()
         cantidad_label = QLabel("Cantidad:")
@@ -230,7 +466,7 @@ class CalculadoraPreciosApp(QMainWindow):
 
         self.add_to_quote_button = QPushButton(" Agregar a la Cotización")
         try:
-            self.add_to_quote_button.setIcon(QIcon("add_icon.png"))
+            self.add_to_quote_button.setIcon(cargar_icono("add_icon.png", 18))
         except FileNotFoundError:
             print("Advertencia: No se encontró 'add_icon.png'.")
         self.add_to_quote_button.setIconSize(QSize(18, 18))
@@ -283,13 +519,13 @@ class CalculadoraPreciosApp(QMainWindow):
         final_buttons_layout = QHBoxLayout()
         self.clear_quote_button = QPushButton(" Limpiar")
         try:
-            self.clear_quote_button.setIcon(QIcon("clear_icon.png"))
+            self.clear_quote_button.setIcon(cargar_icono("clear_icon.png", 18))
         except FileNotFoundError:
             print("Advertencia: No se encontró 'clear_icon.png'.")
         self.clear_quote_button.setIconSize(QSize(18, 18))
         self.generate_pdf_button = QPushButton(" Generar PDF")
         try:
-            self.generate_pdf_button.setIcon(QIcon("pdf_icon.png"))
+            self.generate_pdf_button.setIcon(cargar_icono("pdf_icon.png", 18))
         except FileNotFoundError:
             print("Advertencia: No se encontró 'pdf_icon.png'.")
         self.generate_pdf_button.setIconSize(QSize(18, 18))
@@ -306,6 +542,13 @@ class CalculadoraPreciosApp(QMainWindow):
 
         main_layout.addLayout(controles_layout, 1)
         main_layout.addLayout(cotizacion_layout, 2)
+
+        # --- Menú de Exportación ---
+        menu_exportar = self.menuBar().addMenu("Exportar")
+        for formato, (etiqueta, _mime) in FORMATOS_EXPORTACION.items():
+            accion = QAction(f"Exportar a {etiqueta}...", self)
+            accion.triggered.connect(lambda _checked=False, f=formato: self.exportar_cotizacion_archivo(f))
+            menu_exportar.addAction(accion)
         
         self.set_stylesheet()
     
@@ -538,9 +781,122 @@ class CalculadoraPreciosApp(QMainWindow):
             json.dump(productos, f, indent=4, ensure_ascii=False)
 
     def actualizar_combo_productos(self):
-        self.product_combo.clear()
-        for p in self.productos:
-            self.product_combo.addItem(p["nombre"], userData=p)
+        # Se arma el modelo completo y se asigna de una vez, en lugar de insertar fila por fila.
+        filas = [fila_combo_producto(p) for p in self.productos]
+        modelo = QStandardItemModel(self.product_combo)
+        if filas:
+            modelo.appendColumn(filas)
+        self.product_combo.setModel(modelo)
+        self.product_combo.view().setUniformItemSizes(True)
+        # setModel puede reasignar el modelo del completer del combo; se restaura el de búsqueda.
+        self.completer_productos.setModel(self.modelo_busqueda)
+        self.modelo_busqueda.set_productos(self.productos)
+
+    def vigilar_catalogo(self, _directorio):
+        # Si el archivo se reemplazó (guardado atómico o copia desde otra estación) el watcher lo pierde.
+        if self.ruta_catalogo not in self.watcher_catalogo.files() and os.path.exists(self.ruta_catalogo):
+            self.watcher_catalogo.addPath(self.ruta_catalogo)
+            self.programar_recarga(self.ruta_catalogo)
+
+    def programar_recarga(self, ruta):
+        if ruta not in self.watcher_catalogo.files() and os.path.exists(ruta):
+            self.watcher_catalogo.addPath(ruta)
+        self.timer_recarga.start()
+
+    def recargar_catalogo(self):
+        self.solicitud_recarga += 1
+        self.base_recarga = self.productos
+        self.cargador_catalogo.cargar(self.solicitud_recarga, self.ruta_catalogo, list(self.productos))
+
+    def aplicar_recarga(self, solicitud, resultado):
+        if solicitud != self.solicitud_recarga:
+            return  # Llegó una lectura más reciente.
+        if isinstance(resultado, Exception):
+            print(f"Advertencia: No se pudo recargar '{JSON_FILE}': {resultado}")
+            return
+        if self.productos is not self.base_recarga:
+            # El catálogo cambió localmente mientras se leía; se vuelve a comparar.
+            self.timer_recarga.start()
+            return
+
+        nuevos, (insertados, actualizados, eliminados), indice = resultado
+        self.productos = nuevos
+        self.modelo_busqueda.set_productos(nuevos, indice)
+        if not (insertados or actualizados or eliminados):
+            return
+
+        # Solo se tocan las filas que cambiaron; la cotización abierta no se modifica.
+        id_seleccionado = self.product_combo.currentData(ROL_ID_PRODUCTO)
+        texto_busqueda = self.product_combo.currentText()
+        modelo = self.product_combo.model()
+        self.product_combo.blockSignals(True)
+        try:
+            ids_eliminados = set(eliminados)
+            filas_eliminadas = [r for r in range(modelo.rowCount()) if modelo.item(r).data(ROL_ID_PRODUCTO) in ids_eliminados]
+            # Se borran de abajo hacia arriba en bloques de filas contiguas.
+            while filas_eliminadas:
+                fin = filas_eliminadas.pop()
+                inicio = fin
+                while filas_eliminadas and filas_eliminadas[-1] == inicio - 1:
+                    inicio = filas_eliminadas.pop()
+                modelo.removeRows(inicio, fin - inicio + 1)
+
+            if actualizados:
+                filas = {modelo.item(r).data(ROL_ID_PRODUCTO): r for r in range(modelo.rowCount())}
+                for p in actualizados:
+                    item = modelo.item(filas[p["id"]])
+                    item.setText(p["nombre"])
+                    item.setData(p, Qt.ItemDataRole.UserRole)
+
+            # Los insertados vienen en el orden de 'nuevos'; al insertarlos de menor a mayor posición
+            # cada uno queda en el mismo lugar que ocupa en el catálogo.
+            posiciones = {p["id"]: i for i, p in enumerate(nuevos)}
+            for p in insertados:
+                modelo.insertRow(min(posiciones[p["id"]], modelo.rowCount()), fila_combo_producto(p))
+
+            fila = self.product_combo.findData(id_seleccionado, ROL_ID_PRODUCTO) if id_seleccionado is not None else -1
+            if fila >= 0:
+                self.product_combo.setCurrentIndex(fila)
+                if self.product_combo.lineEdit().hasFocus():
+                    self.product_combo.setEditText(texto_busqueda)
+        finally:
+            self.product_combo.blockSignals(False)
+
+        self.statusBar().showMessage(
+            f"Catálogo actualizado: {len(insertados)} nuevo(s), {len(actualizados)} modificado(s), {len(eliminados)} eliminado(s).",
+            5000
+        )
+
+    def buscar_productos(self, texto):
+        self.modelo_busqueda.buscar(texto)
+        self.completer_productos.complete()
+
+    def seleccionar_producto_buscado(self, index):
+        fila = self.product_combo.findData(index.data(ROL_ID_PRODUCTO), ROL_ID_PRODUCTO)
+        if fila >= 0:
+            self.product_combo.setCurrentIndex(fila)
+
+    def producto_seleccionado(self):
+        """Producto que corresponde al texto del buscador. Si el texto ya no es el nombre del producto
+        elegido se resuelve con el índice (id exacto o un único resultado); si es ambiguo regresa None."""
+        texto = self.product_combo.currentText().strip()
+        producto = self.product_combo.currentData()
+        if producto and texto == producto["nombre"]:
+            return producto
+        if not texto:
+            return None
+        indice = self.modelo_busqueda.indice
+        posicion = indice.posicion(int(texto)) if texto.isdigit() else None
+        if posicion is None:
+            coincidencias = indice.buscar(texto, limite=2)
+            if len(coincidencias) != 1:
+                return None
+            posicion = coincidencias[0]
+        producto = self.modelo_busqueda.productos[posicion]
+        fila = self.product_combo.findData(producto["id"], ROL_ID_PRODUCTO)
+        if fila >= 0:
+            self.product_combo.setCurrentIndex(fila)
+        return producto
 
     def abrir_configuracion(self):
         dialog = ConfiguracionDialog(self.productos.copy(), self) # Pasamos una copia
@@ -551,8 +907,12 @@ class CalculadoraPreciosApp(QMainWindow):
             QMessageBox.information(self, "Éxito", "La lista de productos ha sido actualizada.")
     
     def agregar_a_cotizacion(self):
-        producto = self.product_combo.currentData()
-        if not producto: return
+        producto = self.producto_seleccionado()
+        if not producto:
+            if self.product_combo.currentText().strip():
+                QMessageBox.warning(self, "Producto no encontrado",
+                                    "El texto escrito no corresponde a un solo producto. Elige uno de la lista.")
+            return
         
         cantidad = self.cantidad_spinbox.value()
         precio_unitario = 0
@@ -569,8 +929,11 @@ class CalculadoraPreciosApp(QMainWindow):
                 return
 
         subtotal = cantidad * precio_unitario
-        item = { "nombre": producto["nombre"], "cantidad": cantidad, "precio_unitario": precio_unitario, "subtotal": subtotal }
+        item = { "nombre": producto["nombre"], "cantidad": cantidad, "precio_unitario": precio_unitario, "subtotal": subtotal,
+                 "id": producto["id"], "tipo_precio": "Minorista" if self.minorista_radio.isChecked() else "Mayorista",
+                 "piezas_por_caja": producto["piezas_por_caja"], "costo_distribuidor_iva": producto["costo_distribuidor_iva"] }
         self.cotizacion_actual.append(item)
+        self.folio_cotizacion = nuevo_folio()
         self.actualizar_tabla_y_totales()
 
     def actualizar_tabla_y_totales(self):
@@ -593,8 +956,12 @@ class CalculadoraPreciosApp(QMainWindow):
 
     def limpiar_cotizacion(self):
         self.cotizacion_actual = []
+        self.folio_cotizacion = nuevo_folio()
         self.nombre_cliente_input.clear()
         self.actualizar_tabla_y_totales()
+
+    def renovar_folio(self, *_):
+        self.folio_cotizacion = nuevo_folio()
         
     def generar_pdf(self):
         if not self.cotizacion_actual:
@@ -614,6 +981,7 @@ class CalculadoraPreciosApp(QMainWindow):
         # --- DIBUJAR PDF ---
         c.setFont("Helvetica-Bold", 16)
         c.drawString(inch, height - inch, "Cotización - Distribuidora de Agua")
+        dibujar_logo_pdf(c, width - inch, height - inch - 55, 0.9 * inch)
         c.setFont("Helvetica", 10)
         c.drawString(inch, height - inch - 20, "Fecha: " + fecha_actual)
         c.drawString(inch, height - inch - 40, "Cliente: " + nombre_cliente)
@@ -654,8 +1022,53 @@ class CalculadoraPreciosApp(QMainWindow):
         c.drawString(inch * 6.5, y_pos, f"${total_final:,.2f}")
         
         c.save()
+        try:
+            registrar_cotizacion(self.cotizacion_actual, nombre_cliente, self.folio_cotizacion)
+        except sqlite3.Error as e:
+            print(f"Advertencia: No se pudo registrar la cotización en el historial: {e}")
         QMessageBox.information(self, "PDF Generado", f"El archivo '{nombre_archivo}' se ha guardado exitosamente.")
 
+    def exportar_cotizacion_archivo(self, formato):
+        if not self.cotizacion_actual:
+            QMessageBox.warning(self, "Cotización Vacía", "No hay productos para exportar.")
+            return
+
+        etiqueta = FORMATOS_EXPORTACION[formato][0]
+        nombre_cliente = self.nombre_cliente_input.text() or "sin_cliente"
+        nombre_sugerido = f"cotizacion_{nombre_cliente.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.{formato}"
+        nombre_archivo, _ = QFileDialog.getSaveFileName(self, f"Exportar a {etiqueta}", nombre_sugerido, f"{etiqueta} (*.{formato})")
+        if not nombre_archivo:
+            return
+
+        try:
+            with open(nombre_archivo, 'wb') as f:
+                exportar_cotizacion(self.cotizacion_actual, formato, f)
+        except OSError as e:
+            QMessageBox.warning(self, "Error", f"No se pudo exportar la cotización: {e}")
+            return
+        QMessageBox.information(self, "Exportación Completa", f"El archivo '{nombre_archivo}' se ha guardado exitosamente.")
+
+    def abrir_plan_carga(self):
+        try:
+            pedidos = pedidos_del_dia()
+        except sqlite3.Error as e:
+            QMessageBox.warning(self, "Error", f"No se pudo leer el historial de cotizaciones: {e}")
+            return
+        if not pedidos:
+            QMessageBox.information(self, "Sin Pedidos", "No hay cotizaciones registradas hoy para planear la carga.")
+            return
+        dialogo_camion = CamionDialog(self.camion_carga, self)
+        if dialogo_camion.exec() != QDialog.DialogCode.Accepted:
+            return
+        self.camion_carga = dialogo_camion.camion()
+        try:
+            # Los pedidos del historial no tienen zona: se planean como un solo grupo, sin procesos extra.
+            plan = planear_carga(pedidos, self.productos, self.camion_carga)
+        except (KeyError, ValueError) as e:
+            QMessageBox.warning(self, "Error", f"No se pudo armar el plan de carga: {e}")
+            return
+        PlanCargaDialog(plan, self.camion_carga, partidas_sin_producto(pedidos, self.productos), self).exec()
+
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     window = CalculadoraPreciosApp()
@@ -3,25 +3,48 @@
 
 import streamlit as st
 import pandas as pd
-import json
 from datetime import datetime
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.units import inch
 import io
+import sqlite3
+from busqueda_productos import IndiceProductos
+from catalogo_web import cargar_productos
+from historial_ventas import registrar_cotizacion, nuevo_folio
+from recursos_graficos import url_variante, dibujar_logo_pdf
+from exportar_cotizacion import exportar_cotizacion, FORMATOS_EXPORTACION
 
 IVA_FACTOR = 1.16
-JSON_FILE = "productos.json"
 
 # --- Funciones de Lógica ---
-def cargar_productos():
-    """Carga los productos desde el archivo JSON."""
+@st.cache_resource(max_entries=2)
+def indice_productos(firma, generacion, _productos):
+    """Índice de búsqueda del catálogo; se reconstruye solo cuando cambia el archivo compilado.
+    La firma (inodo, mtime, tamaño) cubre un catálogo regenerado desde cero, cuya generación vuelve a 1."""
+    return IndiceProductos(_productos)
+
+def renovar_folio():
+    """La cotización cambió (partidas o cliente): al descargarla de nuevo cuenta como otra cotización."""
+    st.session_state.folio_cotizacion = nuevo_folio()
+    st.session_state.archivos_cotizacion = {}
+
+def archivo_cotizacion(formato, generar):
+    """Bytes del archivo de la cotización en 'formato'. Se generan una vez por folio y se reusan en
+    los reruns siguientes; renovar_folio() los descarta cuando cambian las partidas o el cliente."""
+    archivos = st.session_state.archivos_cotizacion
+    if formato not in archivos:
+        archivos[formato] = generar()
+    return archivos[formato]
+
+def registrar_descarga(cotizacion_actual, nombre_cliente, folio):
+    """Registra en el historial la cotización descargada. Si la base falla, la descarga sigue y se avisa.
+    Se llama con el clic; el PDF ya está en el servidor y ligado a esta sesión (se pasan bytes, no un
+    archivo diferido), así que no se registra una descarga que el servidor haya descartado."""
     try:
-        with open(JSON_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        st.error(f"No se pudo cargar o no existe el archivo '{JSON_FILE}'.")
-        return []
+        registrar_cotizacion(cotizacion_actual, nombre_cliente, folio)
+    except sqlite3.Error as e:
+        st.toast(f"No se pudo registrar la cotización en el historial: {e}", icon="⚠️")
 
 def generar_pdf(nombre_cliente, cotizacion_actual, totales):
     """Genera un PDF de la cotización en memoria."""
@@ -32,6 +55,7 @@ def generar_pdf(nombre_cliente, cotizacion_actual, totales):
     # --- DIBUJAR PDF ---
     c.setFont("Helvetica-Bold", 16)
     c.drawString(inch, height - inch, "Cotización - Distribuidora de Agua")
+    dibujar_logo_pdf(c, width - inch, height - inch - 55, 0.9 * inch)
     
     fecha_actual = datetime.now().strftime("%d de %B de %Y")
     c.setFont("Helvetica", 10)
@@ -83,6 +107,8 @@ st.set_page_config(page_title="Cotizador de Agua", layout="wide")
 # Inicializar estado de la sesión para guardar la cotización
 if 'cotizacion_actual' not in st.session_state:
     st.session_state.cotizacion_actual = []
+if 'archivos_cotizacion' not in st.session_state:
+    renovar_folio()
 
 # Cargar productos
 productos = cargar_productos()
@@ -93,47 +119,65 @@ col1, col2 = st.columns([1, 1.5])
 # --- Columna Izquierda: Controles ---
 with col1:
     try:
-        st.image("logo.png", width=250)
-    except:
+        # Variante pre-escalada servida como archivo estático con URL versionada: Streamlit no vuelve a
+        # leer ni codificar la imagen en cada rerun. El navegador la revalida con ETag; con
+        # servidor_web.py además la guarda como inmutable y ya no la vuelve a pedir.
+        st.markdown(f'<img src="{url_variante("logo.png", 250)}" width="250" alt="Logo">', unsafe_allow_html=True)
+    except OSError:
         st.title("💧 Cotizador")
     
     st.markdown("### Datos de la Cotización")
-    nombre_cliente = st.text_input("Nombre del Cliente", placeholder="Escribe el nombre del cliente aquí")
+    nombre_cliente = st.text_input("Nombre del Cliente", placeholder="Escribe el nombre del cliente aquí",
+                                   on_change=renovar_folio)
     
     st.markdown("### Agregar Producto")
     
     if not productos:
         st.warning("No hay productos para seleccionar. Edita tu archivo 'productos.json'.")
     else:
-        nombres_productos = [p["nombre"] for p in productos]
-        producto_seleccionado_nombre = st.selectbox("Producto:", nombres_productos)
-        
-        cantidad = st.number_input("Cantidad (cajas):", min_value=1, value=1)
+        indice = indice_productos(productos.firma, productos.generacion, productos)
+        busqueda = st.text_input("Buscar producto:", placeholder="Nombre o ID del producto")
+        # Las opciones son ids y no posiciones, para que la selección siga en el mismo producto
+        # aunque el catálogo se regenere con otro orden entre dos reruns.
+        coincidencias = list(dict.fromkeys(productos[i]["id"] for i in indice.buscar(busqueda, limite=50)))
+
+        if not coincidencias:
+            st.warning("Ningún producto coincide con la búsqueda.")
+        else:
+            id_producto = st.selectbox("Producto:", coincidencias,
+                                       format_func=lambda pid: productos[indice.posicion(pid)]["nombre"])
+            producto_actual = productos[indice.posicion(id_producto)]
+
+            cantidad = st.number_input("Cantidad (cajas):", min_value=1, value=1)
         
-        tipo_precio = st.radio("Tipo de Precio:", ["Minorista", "Mayorista"], horizontal=True)
+            tipo_precio = st.radio("Tipo de Precio:", ["Minorista", "Mayorista"], horizontal=True)
         
-        precio_unitario = 0
-        producto_actual = next(p for p in productos if p["nombre"] == producto_seleccionado_nombre)
+            precio_unitario = 0
 
-        if tipo_precio == "Minorista":
-            precio_unitario = producto_actual["precio_minorista_iva"]
-        else:
-            margen = st.number_input("Margen de Ganancia (%):", min_value=0.0, value=25.0, step=1.0)
-            costo_sin_iva = producto_actual["costo_distribuidor_iva"] / IVA_FACTOR
-            precio_unitario = (costo_sin_iva * (1 + margen / 100)) * IVA_FACTOR
+            if tipo_precio == "Minorista":
+                precio_unitario = producto_actual["precio_minorista_iva"]
+            else:
+                margen = st.number_input("Margen de Ganancia (%):", min_value=0.0, value=25.0, step=1.0)
+                costo_sin_iva = producto_actual["costo_distribuidor_iva"] / IVA_FACTOR
+                precio_unitario = (costo_sin_iva * (1 + margen / 100)) * IVA_FACTOR
         
-        st.info(f"Precio por caja: ${precio_unitario:,.2f}")
-
-        if st.button("Agregar a la Cotización", use_container_width=True, type="primary"):
-            subtotal = cantidad * precio_unitario
-            item = {
-                "nombre": producto_actual["nombre"],
-                "cantidad": cantidad,
-                "precio_unitario": precio_unitario,
-                "subtotal": subtotal
-            }
-            st.session_state.cotizacion_actual.append(item)
-            st.success(f"¡{producto_actual['nombre']} agregado!")
+            st.info(f"Precio por caja: ${precio_unitario:,.2f}")
+
+            if st.button("Agregar a la Cotización", use_container_width=True, type="primary"):
+                subtotal = cantidad * precio_unitario
+                item = {
+                    "nombre": producto_actual["nombre"],
+                    "cantidad": cantidad,
+                    "precio_unitario": precio_unitario,
+                    "subtotal": subtotal,
+                    "id": producto_actual["id"],
+                    "tipo_precio": tipo_precio,
+                    "piezas_por_caja": producto_actual["piezas_por_caja"],
+                    "costo_distribuidor_iva": producto_actual["costo_distribuidor_iva"]
+                }
+                st.session_state.cotizacion_actual.append(item)
+                renovar_folio()
+                st.success(f"¡{producto_actual['nombre']} agregado!")
 
 # --- Columna Derecha: Resumen ---
 with col2:
@@ -143,7 +187,7 @@ with col2:
         st.info("Añade productos desde el panel de la izquierda para empezar.")
     else:
         # Usar Pandas para crear una tabla
-        df = pd.DataFrame(st.session_state.cotizacion_actual)
+        df = pd.DataFrame(st.session_state.cotizacion_actual, columns=["nombre", "cantidad", "precio_unitario", "subtotal"])
         df_display = df.rename(columns={
             "nombre": "Producto", "cantidad": "Cantidad",
             "precio_unitario": "P. Unitario", "subtotal": "Subtotal"
@@ -182,16 +226,32 @@ with col2:
         with action_col1:
             if st.button("Limpiar Cotización", use_container_width=True):
                 st.session_state.cotizacion_actual = []
+                renovar_folio()
                 st.rerun() 
 
         with action_col2:
             if nombre_cliente and st.session_state.cotizacion_actual:
-                pdf_buffer = generar_pdf(nombre_cliente, st.session_state.cotizacion_actual, totales)
                 nombre_archivo = f"cotizacion_{nombre_cliente.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.pdf"
                 st.download_button(
                     label="Descargar PDF",
-                    data=pdf_buffer,
+                    data=archivo_cotizacion("pdf", lambda: generar_pdf(nombre_cliente, st.session_state.cotizacion_actual, totales).getvalue()),
                     file_name=nombre_archivo,
                     mime="application/pdf",
+                    use_container_width=True,
+                    on_click=registrar_descarga,
+                    args=(st.session_state.cotizacion_actual, nombre_cliente, st.session_state.folio_cotizacion)
+                )
+
+        # Exportación de partidas para contabilidad
+        st.markdown("##### Exportar partidas")
+        nombre_base = f"cotizacion_{(nombre_cliente or 'sin_cliente').replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}"
+        export_cols = st.columns(len(FORMATOS_EXPORTACION))
+        for export_col, (formato, (etiqueta, mime)) in zip(export_cols, FORMATOS_EXPORTACION.items()):
+            with export_col:
+                st.download_button(
+                    label=f"Descargar {etiqueta}",
+                    data=archivo_cotizacion(formato, lambda: exportar_cotizacion(st.session_state.cotizacion_actual, formato).getvalue()),
+                    file_name=f"{nombre_base}.{formato}",
+                    mime=mime,
                     use_container_width=True
                 )
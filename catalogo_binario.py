@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+# Archivo: catalogo_binario.py
+#
+# Catálogo compilado de productos para compartir entre varios procesos del mismo
+# equipo. Cada proceso mapea el archivo en modo solo lectura, de modo que las
+# páginas viven una sola vez en la caché del sistema operativo.
+#
+# Formato (little-endian):
+#   encabezado (48 bytes): magia, versión, número de productos, generación,
+#       mtime (ns) y tamaño del JSON del que se compiló
+#   columnas fijas de n elementos: id (q), piezas_por_caja (q),
+#       costo_distribuidor_iva (d), precio_minorista_iva (d), pvps_caja (d)
+#   desplazamientos de nombres: n + 1 enteros (Q) relativos a la tabla de cadenas
+#   tabla de cadenas: nombres en UTF-8 concatenados
+
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+
+MAGIA = b"CATAGUA1"
+VERSION_FORMATO = 2
+CATALOGO_FILE = "productos.catalogo"
+
+_ENCABEZADO = struct.Struct("<8sHHIQqQ")
+_TAM_ENCABEZADO = 48
+_COLUMNAS = (
+    ("id", "q"),
+    ("piezas_por_caja", "q"),
+    ("costo_distribuidor_iva", "d"),
+    ("precio_minorista_iva", "d"),
+    ("pvps_caja", "d"),
+)
+
+
+def _desplazamientos(n):
+    """Calcula dónde empieza cada columna, los desplazamientos de nombres y la tabla de cadenas."""
+    columnas = {}
+    pos = _TAM_ENCABEZADO
+    for nombre, _fmt in _COLUMNAS:
+        columnas[nombre] = pos
+        pos += 8 * n
+    pos_nombres = pos
+    pos_cadenas = pos_nombres + 8 * (n + 1)
+    return columnas, pos_nombres, pos_cadenas
+
+
+def _firma(estado):
+    return (estado.st_ino, estado.st_mtime_ns, estado.st_size)
+
+
+def _origen(estado):
+    """(mtime en ns, tamaño) del JSON; se guarda en el encabezado del catálogo compilado."""
+    return (estado.st_mtime_ns, estado.st_size)
+
+
+def _leer_encabezado(ruta):
+    """Regresa (generación, origen) de un catálogo compilado, o None si no existe o es inválido."""
+    try:
+        with open(ruta, "rb") as f:
+            datos = f.read(_ENCABEZADO.size)
+    except FileNotFoundError:
+        return None
+    if len(datos) < _ENCABEZADO.size:
+        return None
+    magia, version, _reservado, _n, generacion, mtime_origen, tam_origen = _ENCABEZADO.unpack(datos)
+    if magia != MAGIA or version != VERSION_FORMATO:
+        return None
+    return generacion, (mtime_origen, tam_origen)
+
+
+def _empacar_columna(productos, campo, fmt):
+    try:
+        return struct.pack(f"<{len(productos)}{fmt}", *(p[campo] for p in productos))
+    except (KeyError, TypeError, struct.error):
+        pass
+    # Se vuelve a recorrer solo para señalar el producto con el dato inválido.
+    for i, p in enumerate(productos, start=1):
+        try:
+            struct.pack("<" + fmt, p[campo])
+        except (KeyError, TypeError, struct.error) as e:
+            raise ValueError(f"El producto {i} no tiene un valor válido en '{campo}' ({e}).") from e
+    raise ValueError(f"No se pudo compilar la columna '{campo}'.")
+
+
+def leer_generacion(ruta):
+    """Regresa la generación de un catálogo compilado, o 0 si no existe o es inválido."""
+    encabezado = _leer_encabezado(ruta)
+    return encabezado[0] if encabezado else 0
+
+
+def compilar_catalogo(productos, ruta=CATALOGO_FILE, generacion=None, origen=(0, 0)):
+    """Escribe los productos en formato binario. El reemplazo es atómico, los lectores
+    ven el archivo anterior o el nuevo, nunca uno a medias. 'origen' es el (mtime, tamaño)
+    del JSON leído, con el que compilar_si_cambio sabe si el JSON cambió después.
+
+    Lanza ValueError si a algún producto le falta un campo o tiene un valor del tipo equivocado
+    (por ejemplo piezas_por_caja con decimales).
+    """
+    if generacion is None:
+        generacion = leer_generacion(ruta) + 1
+    n = len(productos)
+    # Se empaca todo antes de abrir el archivo para no dejar temporales a medias si hay un error.
+    columnas = [_empacar_columna(productos, campo, fmt) for campo, fmt in _COLUMNAS]
+    nombres = []
+    for i, p in enumerate(productos, start=1):
+        try:
+            nombres.append(p["nombre"].encode("utf-8"))
+        except (KeyError, TypeError, AttributeError) as e:
+            raise ValueError(f"El producto {i} no tiene un valor válido en 'nombre' ({e}).") from e
+    offsets_nombres = [0]
+    for nombre in nombres:
+        offsets_nombres.append(offsets_nombres[-1] + len(nombre))
+
+    # El id del hilo evita que dos sesiones del mismo proceso escriban el mismo temporal.
+    tmp = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_ENCABEZADO.pack(MAGIA, VERSION_FORMATO, 0, n, generacion, *origen).ljust(_TAM_ENCABEZADO, b"\0"))
+        for columna in columnas:
+            f.write(columna)
+        f.write(struct.pack(f"<{n + 1}Q", *offsets_nombres))
+        f.write(b"".join(nombres))
+        f.flush()
+        os.fsync(f.fileno())
+    try:
+        # En Windows falla con PermissionError si otro proceso tiene mapeado el catálogo anterior.
+        os.replace(tmp, ruta)
+    except OSError:
+        os.remove(tmp)
+        raise
+    return generacion
+
+
+def compilar_si_cambio(ruta_json, ruta=CATALOGO_FILE):
+    """Recompila el catálogo si el JSON no es el mismo del que se compiló: otro mtime u otro
+    tamaño, también si se restauró uno más antiguo. Regresa True si se generó una nueva versión."""
+    encabezado = _leer_encabezado(ruta)
+    if encabezado and encabezado[1] == _origen(os.stat(ruta_json)):
+        return False
+    with open(ruta_json, "r", encoding="utf-8") as f:
+        # Se toma antes de leer: si otra estación reescribe el JSON mientras se compila, el origen
+        # guardado ya no coincide y la siguiente llamada vuelve a compilar.
+        origen = _origen(os.fstat(f.fileno()))
+        productos = json.load(f)
+    compilar_catalogo(productos, ruta, encabezado[0] + 1 if encabezado else None, origen)
+    return True
+
+
+class CatalogoMapeado:
+    """Vista de solo lectura sobre una generación del catálogo compilado.
+
+    Se comporta como una secuencia de diccionarios de producto; los registros se
+    decodifican al accederse, así que abrirlo no depende del tamaño del catálogo.
+    Una instancia nunca cambia: si se publica otra generación se crea otra
+    instancia, y el mapa de esta se libera cuando nadie la referencia.
+    """
+
+    def __init__(self, ruta=CATALOGO_FILE):
+        self.ruta = ruta
+        with open(ruta, "rb") as f:
+            estado = os.fstat(f.fileno())
+            if estado.st_size < _TAM_ENCABEZADO:
+                raise ValueError(f"'{ruta}' no es un catálogo compilado válido.")
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magia, version, _reservado, n, generacion, _mtime_origen, _tam_origen = _ENCABEZADO.unpack_from(self._mm, 0)
+        if magia != MAGIA or version != VERSION_FORMATO:
+            raise ValueError(f"'{ruta}' no es un catálogo compilado válido.")
+        self._columnas, self._pos_nombres, self._pos_cadenas = _desplazamientos(n)
+        # Un encabezado dañado o un archivo truncado no debe leerse fuera del mapa.
+        if (self._pos_cadenas > estado.st_size
+                or self._pos_cadenas + struct.unpack_from("<Q", self._mm, self._pos_nombres + 8 * n)[0] != estado.st_size):
+            raise ValueError(f"'{ruta}' está incompleto o dañado.")
+        # (inodo, mtime, tamaño) del archivo mapeado; distingue un catálogo regenerado desde
+        # cero aunque su generación vuelva a empezar en 1.
+        self.firma = _firma(estado)
+        self.generacion = generacion
+        self._n = n
+
+    def __len__(self):
+        return self._n
+
+    def _valor(self, campo, fmt, i):
+        return struct.unpack_from("<" + fmt, self._mm, self._columnas[campo] + 8 * i)[0]
+
+    def nombre(self, i):
+        inicio, fin = struct.unpack_from("<2Q", self._mm, self._pos_nombres + 8 * i)
+        return self._mm[self._pos_cadenas + inicio:self._pos_cadenas + fin].decode("utf-8")
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self._n
+        if not 0 <= i < self._n:
+            raise IndexError("índice de producto fuera de rango")
+        producto = {"id": self._valor("id", "q", i), "nombre": self.nombre(i)}
+        for campo, fmt in _COLUMNAS[1:]:
+            producto[campo] = self._valor(campo, fmt, i)
+        return producto
+
+    def __iter__(self):
+        for i in range(self._n):
+            yield self[i]
+
+
+class CatalogoCompartido:
+    """Publica la generación vigente del catálogo para los hilos de un proceso.
+
+    Cada lector toma una sola instancia con vigente() y la usa hasta terminar; una
+    generación nueva se publica reemplazando la referencia, sin tocar la anterior,
+    así que nadie lee un mapa cerrado ni mezcla registros de dos generaciones.
+    """
+
+    def __init__(self, ruta=CATALOGO_FILE):
+        self.ruta = ruta
+        self._candado = threading.Lock()
+        self._actual = CatalogoMapeado(ruta)
+
+    def vigente(self):
+        """Regresa la generación publicada más reciente, mapeándola si el archivo cambió."""
+        actual = self._actual
+        try:
+            firma = _firma(os.stat(self.ruta))
+        except FileNotFoundError:
+            return actual
+        if firma == actual.firma:
+            return actual
+        with self._candado:
+            if self._actual.firma != firma:
+                self._actual = CatalogoMapeado(self.ruta)
+            return self._actual
+
+
+if __name__ == "__main__":
+    # Uso: python catalogo_binario.py [productos.json] [productos.catalogo]
+    ruta_json = sys.argv[1] if len(sys.argv) > 1 else "productos.json"
+    ruta_bin = sys.argv[2] if len(sys.argv) > 2 else CATALOGO_FILE
+    with open(ruta_json, "r", encoding="utf-8") as f:
+        gen = compilar_catalogo(json.load(f), ruta_bin)
+    print(f"Catálogo '{ruta_bin}' compilado (generación {gen}).")
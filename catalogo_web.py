@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+# Archivo: catalogo_web.py
+#
+# Carga del catálogo para todas las páginas de la app web. Al vivir en un solo
+# módulo, el st.cache_resource tiene una sola entrada por proceso y el archivo
+# compilado se mapea una sola vez, la use la calculadora o el simulador.
+
+import json
+
+import streamlit as st
+
+from catalogo_binario import CatalogoCompartido, compilar_si_cambio, CATALOGO_FILE
+
+JSON_FILE = "productos.json"
+
+
+@st.cache_resource
+def catalogo_compartido():
+    """Catálogo compilado mapeado en memoria, uno por proceso y compartido entre sesiones.
+    Las páginas del archivo las comparten todos los procesos del mismo equipo."""
+    compilar_si_cambio(JSON_FILE, CATALOGO_FILE)
+    return CatalogoCompartido(CATALOGO_FILE)
+
+
+def cargar_productos():
+    """Carga los productos desde el catálogo compilado a partir del archivo JSON.
+    Se llama una vez por rerun y todo el rerun usa esa misma generación del catálogo.
+    Si no se puede cargar muestra el error y regresa una lista vacía."""
+    try:
+        catalogo = catalogo_compartido()
+        # Si el JSON cambió se publica una generación nueva; los demás procesos la detectan al remapear.
+        compilar_si_cambio(JSON_FILE, CATALOGO_FILE)
+        return catalogo.vigente()
+    except FileNotFoundError:
+        st.error(f"No se pudo cargar o no existe el archivo '{JSON_FILE}'.")
+        return []
+    except OSError as e:
+        # Por ejemplo en Windows, si otro proceso aún tiene mapeado el catálogo que se iba a reemplazar.
+        st.error(f"No se pudo cargar el archivo '{JSON_FILE}': {e}")
+        return []
+    except (json.JSONDecodeError, ValueError) as e:
+        st.error(f"El archivo '{JSON_FILE}' tiene errores: {e}")
+        return []
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+# Archivo: exportar_cotizacion.py
+
+import csv
+import io
+import json
+import zipfile
+from xml.sax.saxutils import escape
+
+COLUMNAS_EXPORTACION = ("nombre", "cantidad", "precio_unitario", "subtotal")
+
+FORMATOS_EXPORTACION = {
+    "csv": ("CSV", "text/csv"),
+    "xlsx": ("Excel", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "jsonl": ("JSON Lines", "application/x-ndjson"),
+}
+
+# --- Partes fijas del paquete XLSX (SpreadsheetML mínimo, una sola hoja) ---
+_XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+_XLSX_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="Cotizacion" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+_XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+_XLSX_SHEET_INICIO = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_XLSX_SHEET_FIN = '</sheetData></worksheet>'
+
+# Tamaño del bloque que se acumula antes de escribir al destino.
+_FILAS_POR_BLOQUE = 2000
+
+
+def exportar_csv(cotizacion_actual, destino):
+    """Escribe las partidas de la cotización como CSV (UTF-8) en un flujo binario."""
+    texto = io.TextIOWrapper(destino, encoding="utf-8", newline="")
+    try:
+        writer = csv.writer(texto)
+        writer.writerow(COLUMNAS_EXPORTACION)
+        writer.writerows(
+            (item["nombre"], item["cantidad"], item["precio_unitario"], item["subtotal"])
+            for item in cotizacion_actual
+        )
+        texto.flush()
+    finally:
+        # Se desprende el wrapper para no cerrar el flujo del llamador.
+        texto.detach()
+    return destino
+
+
+def exportar_jsonl(cotizacion_actual, destino):
+    """Escribe una partida por línea en formato JSON Lines en un flujo binario."""
+    dumps = json.JSONEncoder(ensure_ascii=False).encode
+    bloque = []
+    for item in cotizacion_actual:
+        bloque.append(dumps({col: item[col] for col in COLUMNAS_EXPORTACION}))
+        if len(bloque) >= _FILAS_POR_BLOQUE:
+            destino.write(("\n".join(bloque) + "\n").encode("utf-8"))
+            bloque = []
+    if bloque:
+        destino.write(("\n".join(bloque) + "\n").encode("utf-8"))
+    return destino
+
+
+def _fila_xlsx(num_fila, item):
+    return (
+        f'<row r="{num_fila}">'
+        f'<c r="A{num_fila}" t="inlineStr"><is><t>{escape(str(item["nombre"]))}</t></is></c>'
+        f'<c r="B{num_fila}"><v>{item["cantidad"]}</v></c>'
+        f'<c r="C{num_fila}"><v>{item["precio_unitario"]!r}</v></c>'
+        f'<c r="D{num_fila}"><v>{item["subtotal"]!r}</v></c>'
+        '</row>'
+    )
+
+
+def exportar_xlsx(cotizacion_actual, destino):
+    """Escribe la cotización como libro XLSX de una hoja, fila por fila, sin cargarla completa en memoria."""
+    encabezado = "".join(
+        f'<c r="{letra}1" t="inlineStr"><is><t>{col}</t></is></c>'
+        for letra, col in zip("ABCD", COLUMNAS_EXPORTACION)
+    )
+    with zipfile.ZipFile(destino, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+        zf.writestr("[Content_Types].xml", _XLSX_CONTENT_TYPES)
+        zf.writestr("_rels/.rels", _XLSX_RELS)
+        zf.writestr("xl/workbook.xml", _XLSX_WORKBOOK)
+        zf.writestr("xl/_rels/workbook.xml.rels", _XLSX_WORKBOOK_RELS)
+        with zf.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as hoja:
+            hoja.write((_XLSX_SHEET_INICIO + f'<row r="1">{encabezado}</row>').encode("utf-8"))
+            bloque = []
+            for num_fila, item in enumerate(cotizacion_actual, start=2):
+                bloque.append(_fila_xlsx(num_fila, item))
+                if len(bloque) >= _FILAS_POR_BLOQUE:
+                    hoja.write("".join(bloque).encode("utf-8"))
+                    bloque = []
+            hoja.write(("".join(bloque) + _XLSX_SHEET_FIN).encode("utf-8"))
+    return destino
+
+
+EXPORTADORES = {
+    "csv": exportar_csv,
+    "xlsx": exportar_xlsx,
+    "jsonl": exportar_jsonl,
+}
+
+
+def exportar_cotizacion(cotizacion_actual, formato, destino=None):
+    """Exporta la cotización al formato indicado ('csv', 'xlsx' o 'jsonl').
+
+    Si no se indica destino se usa un BytesIO, que se regresa al inicio para descargarlo.
+    """
+    if formato not in EXPORTADORES:
+        raise ValueError(f"Formato de exportación no soportado: '{formato}'.")
+    if destino is None:
+        destino = io.BytesIO()
+    EXPORTADORES[formato](cotizacion_actual, destino)
+    if isinstance(destino, io.BytesIO):
+        destino.seek(0)
+    return destino
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+# Archivo: historial_ventas.py
+#
+# Historial de cotizaciones terminadas (solo se agrega, nunca se modifica) y
+# resúmenes diarios por producto y por cliente que se actualizan en la misma
+# transacción, para que el tablero solo lea datos ya agregados.
+#
+# Ingreso y costo se guardan con IVA, como en las cotizaciones; el margen que
+# regresan los resúmenes es sin IVA, igual que la utilidad del simulador.
+
+import sqlite3
+import uuid
+from datetime import datetime
+
+HISTORIAL_DB = "historial_ventas.db"
+IVA_FACTOR = 1.16
+_CEROS = (0, 0, 0.0, 0.0)
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS cotizaciones (
+    folio TEXT PRIMARY KEY,
+    fecha TEXT NOT NULL,
+    registrada TEXT NOT NULL,
+    cliente TEXT NOT NULL,
+    total REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS partidas (
+    folio TEXT NOT NULL REFERENCES cotizaciones(folio),
+    renglon INTEGER NOT NULL,
+    producto_id INTEGER,
+    nombre TEXT NOT NULL,
+    tipo_precio TEXT NOT NULL,
+    cajas INTEGER NOT NULL,
+    piezas INTEGER NOT NULL,
+    precio_unitario REAL NOT NULL,
+    subtotal REAL NOT NULL,
+    costo REAL NOT NULL,
+    PRIMARY KEY (folio, renglon)
+);
+CREATE TABLE IF NOT EXISTS resumen_diario_producto (
+    fecha TEXT NOT NULL,
+    producto_id INTEGER NOT NULL,
+    tipo_precio TEXT NOT NULL,
+    nombre TEXT NOT NULL,
+    cajas INTEGER NOT NULL,
+    piezas INTEGER NOT NULL,
+    ingreso REAL NOT NULL,
+    costo REAL NOT NULL,
+    PRIMARY KEY (fecha, producto_id, tipo_precio)
+);
+CREATE TABLE IF NOT EXISTS resumen_diario_cliente (
+    fecha TEXT NOT NULL,
+    cliente TEXT NOT NULL,
+    tipo_precio TEXT NOT NULL,
+    cotizaciones INTEGER NOT NULL,
+    cajas INTEGER NOT NULL,
+    piezas INTEGER NOT NULL,
+    ingreso REAL NOT NULL,
+    costo REAL NOT NULL,
+    PRIMARY KEY (fecha, cliente, tipo_precio)
+);
+"""
+
+_SUMAR_PRODUCTO = """
+INSERT INTO resumen_diario_producto (fecha, producto_id, tipo_precio, nombre, cajas, piezas, ingreso, costo)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (fecha, producto_id, tipo_precio) DO UPDATE SET
+    nombre = excluded.nombre,
+    cajas = cajas + excluded.cajas,
+    piezas = piezas + excluded.piezas,
+    ingreso = ingreso + excluded.ingreso,
+    costo = costo + excluded.costo
+"""
+
+_SUMAR_CLIENTE = """
+INSERT INTO resumen_diario_cliente (fecha, cliente, tipo_precio, cotizaciones, cajas, piezas, ingreso, costo)
+VALUES (?, ?, ?, 1, ?, ?, ?, ?)
+ON CONFLICT (fecha, cliente, tipo_precio) DO UPDATE SET
+    cotizaciones = cotizaciones + 1,
+    cajas = cajas + excluded.cajas,
+    piezas = piezas + excluded.piezas,
+    ingreso = ingreso + excluded.ingreso,
+    costo = costo + excluded.costo
+"""
+
+
+def nuevo_folio():
+    return uuid.uuid4().hex
+
+
+def conectar(ruta=HISTORIAL_DB):
+    """Abre la base del historial y crea las tablas si no existen."""
+    conn = sqlite3.connect(ruta, timeout=10)
+    conn.row_factory = sqlite3.Row
+    # WAL permite que varios procesos lean mientras otro registra una cotización.
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(_ESQUEMA)
+    return conn
+
+
+def _partida(item):
+    """Datos de una partida; las partidas sin datos de producto (sesiones antiguas) se registran en ceros."""
+    cajas = item["cantidad"]
+    return (
+        item.get("id"),
+        item["nombre"],
+        item.get("tipo_precio", "Minorista"),
+        cajas,
+        cajas * item.get("piezas_por_caja", 0),
+        item["precio_unitario"],
+        item["subtotal"],
+        cajas * item.get("costo_distribuidor_iva", 0.0),
+    )
+
+
+def registrar_cotizacion(cotizacion_actual, nombre_cliente, folio=None, fecha=None, ruta=HISTORIAL_DB):
+    """Agrega una cotización terminada al historial y suma sus partidas a los resúmenes diarios.
+
+    Registrar dos veces el mismo folio no tiene efecto. Regresa True si se registró.
+    """
+    if not cotizacion_actual:
+        return False
+    folio = folio or nuevo_folio()
+    fecha = (fecha or datetime.now()).strftime("%Y-%m-%d")
+    cliente = nombre_cliente.strip() or "Sin cliente"
+    partidas = [_partida(item) for item in cotizacion_actual]
+
+    # Se agrupa primero en memoria para tocar cada fila de resumen una sola vez.
+    nombres = {}
+    por_producto = {}
+    por_cliente = {}
+    for producto_id, nombre, tipo_precio, cajas, piezas, _precio, subtotal, costo in partidas:
+        valores = (cajas, piezas, subtotal, costo)
+        clave = (producto_id if producto_id is not None else -1, tipo_precio)
+        nombres[clave] = nombre
+        por_producto[clave] = [a + b for a, b in zip(por_producto.get(clave, _CEROS), valores)]
+        por_cliente[tipo_precio] = [a + b for a, b in zip(por_cliente.get(tipo_precio, _CEROS), valores)]
+
+    conn = conectar(ruta)
+    try:
+        with conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO cotizaciones (folio, fecha, registrada, cliente, total) VALUES (?, ?, ?, ?, ?)",
+                (folio, fecha, datetime.now().isoformat(timespec="seconds"), cliente,
+                 sum(p[6] for p in partidas))
+            )
+            if cursor.rowcount == 0:
+                return False
+            conn.executemany(
+                "INSERT INTO partidas VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(folio, renglon, *p) for renglon, p in enumerate(partidas, start=1)]
+            )
+            conn.executemany(
+                _SUMAR_PRODUCTO,
+                [(fecha, *clave, nombres[clave], *valores) for clave, valores in por_producto.items()]
+            )
+            conn.executemany(
+                _SUMAR_CLIENTE,
+                [(fecha, cliente, tipo_precio, *valores) for tipo_precio, valores in por_cliente.items()]
+            )
+        return True
+    finally:
+        conn.close()
+
+
+def _consultar(sql, parametros, ruta):
+    conn = conectar(ruta)
+    try:
+        return [dict(fila) for fila in conn.execute(sql, parametros)]
+    finally:
+        conn.close()
+
+
+def resumen_por_producto(desde, hasta, ruta=HISTORIAL_DB):
+    """Totales por producto y tipo de precio entre dos fechas 'YYYY-MM-DD' (inclusive).
+    El ingreso incluye IVA; el margen no."""
+    return _consultar("""
+        SELECT producto_id, MAX(nombre) AS nombre, tipo_precio,
+               SUM(cajas) AS cajas, SUM(piezas) AS piezas,
+               SUM(ingreso) AS ingreso, (SUM(ingreso) - SUM(costo)) / ? AS margen
+        FROM resumen_diario_producto
+        WHERE fecha BETWEEN ? AND ?
+        GROUP BY producto_id, tipo_precio
+        ORDER BY ingreso DESC
+    """, (IVA_FACTOR, desde, hasta), ruta)
+
+
+def resumen_por_cliente(desde, hasta, ruta=HISTORIAL_DB):
+    """Totales por cliente y tipo de precio entre dos fechas 'YYYY-MM-DD' (inclusive).
+    'cotizaciones' cuenta las cotizaciones con partidas de ese tipo de precio: una que tiene
+    partidas Minorista y Mayorista aparece en los dos renglones del cliente, no se suman."""
+    return _consultar("""
+        SELECT cliente, tipo_precio, SUM(cotizaciones) AS cotizaciones,
+               SUM(cajas) AS cajas, SUM(piezas) AS piezas,
+               SUM(ingreso) AS ingreso, (SUM(ingreso) - SUM(costo)) / ? AS margen
+        FROM resumen_diario_cliente
+        WHERE fecha BETWEEN ? AND ?
+        GROUP BY cliente, tipo_precio
+        ORDER BY ingreso DESC
+    """, (IVA_FACTOR, desde, hasta), ruta)
+
+
+def resumen_por_dia(desde, hasta, ruta=HISTORIAL_DB):
+    """Totales diarios por tipo de precio entre dos fechas 'YYYY-MM-DD' (inclusive)."""
+    return _consultar("""
+        SELECT fecha, tipo_precio, SUM(cajas) AS cajas, SUM(piezas) AS piezas,
+               SUM(ingreso) AS ingreso, (SUM(ingreso) - SUM(costo)) / ? AS margen
+        FROM resumen_diario_producto
+        WHERE fecha BETWEEN ? AND ?
+        GROUP BY fecha, tipo_precio
+        ORDER BY fecha
+    """, (IVA_FACTOR, desde, hasta), ruta)
+
+
+def cajas_por_producto(desde, hasta, tipo_precio=None, ruta=HISTORIAL_DB):
+    """Cajas cotizadas por producto entre dos fechas, opcionalmente de un solo tipo de precio."""
+    filas = resumen_por_producto(desde, hasta, ruta)
+    cajas = {}
+    for fila in filas:
+        if fila["producto_id"] >= 0 and tipo_precio in (None, fila["tipo_precio"]):
+            cajas[fila["producto_id"]] = cajas.get(fila["producto_id"], 0) + fila["cajas"]
+    return cajas
+
+
+def pedidos_del_dia(fecha=None, ruta=HISTORIAL_DB):
+    """Cotizaciones registradas en una fecha como pedidos para la planeación de carga.
+    El historial no guarda zona de entrega, así que los pedidos salen sin 'zona' y
+    planear_carga los acomoda todos juntos."""
+    fecha = (fecha or datetime.now()).strftime("%Y-%m-%d")
+    pedidos = {}
+    for fila in _consultar("""
+        SELECT c.folio, c.cliente, p.producto_id, p.cajas
+        FROM cotizaciones c JOIN partidas p ON p.folio = c.folio
+        WHERE c.fecha = ? AND p.producto_id IS NOT NULL
+        ORDER BY c.registrada, p.renglon
+    """, (fecha,), ruta):
+        pedido = pedidos.setdefault(fila["folio"], {"folio": fila["folio"], "cliente": fila["cliente"], "partidas": []})
+        pedido["partidas"].append({"id": fila["producto_id"], "cantidad": fila["cajas"]})
+    return list(pedidos.values())
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+# Archivo: pages/Analitica_de_Ventas.py
+
+import streamlit as st
+import pandas as pd
+from datetime import date, timedelta
+
+from historial_ventas import resumen_por_producto, resumen_por_cliente, resumen_por_dia
+
+st.set_page_config(page_title="Analítica de Ventas", layout="wide")
+
+st.title("📊 Analítica de Ventas")
+st.caption("Datos de las cotizaciones terminadas, leídos de los resúmenes diarios.")
+
+# --- Filtros ---
+filtro_col1, filtro_col2 = st.columns([1, 1])
+with filtro_col1:
+    rango = st.date_input("Periodo:", value=(date.today() - timedelta(days=30), date.today()))
+with filtro_col2:
+    tipos_precio = st.multiselect("Tipo de Precio:", ["Minorista", "Mayorista"], default=["Minorista", "Mayorista"])
+
+if not isinstance(rango, tuple) or len(rango) != 2:
+    st.info("Selecciona la fecha inicial y la final del periodo.")
+    st.stop()
+
+desde, hasta = (d.strftime("%Y-%m-%d") for d in rango)
+COLUMNAS = {
+    "nombre": "Producto", "cliente": "Cliente", "tipo_precio": "Tipo de Precio",
+    "cotizaciones": "Cotizaciones con este tipo", "cajas": "Cajas", "piezas": "Piezas",
+    "ingreso": "Ingreso", "margen": "Margen (sin IVA)"
+}
+
+def filtrar(filas):
+    df = pd.DataFrame(filas, columns=list(filas[0]) if filas else ["tipo_precio"])
+    return df[df["tipo_precio"].isin(tipos_precio)]
+
+por_dia = filtrar(resumen_por_dia(desde, hasta))
+por_producto = filtrar(resumen_por_producto(desde, hasta))
+por_cliente = filtrar(resumen_por_cliente(desde, hasta))
+
+if por_dia.empty:
+    st.info("No hay cotizaciones registradas en este periodo.")
+    st.stop()
+
+# --- Indicadores ---
+ingreso_total = por_dia["ingreso"].sum()
+margen_total = por_dia["margen"].sum()
+met_col1, met_col2, met_col3, met_col4 = st.columns(4)
+with met_col1:
+    st.metric("Ingreso", f"${ingreso_total:,.2f}", help="Con IVA, como en las cotizaciones.")
+with met_col2:
+    st.metric("Margen", f"${margen_total:,.2f}", help="Ingreso menos costo, sin IVA.")
+with met_col3:
+    st.metric("Cajas", f"{por_dia['cajas'].sum():,}")
+with met_col4:
+    st.metric("Piezas", f"{por_dia['piezas'].sum():,}")
+
+st.markdown("### Ingreso diario")
+st.bar_chart(por_dia.pivot_table(index="fecha", columns="tipo_precio", values="ingreso", aggfunc="sum"))
+
+tabla_col1, tabla_col2 = st.columns(2)
+with tabla_col1:
+    st.markdown("### Por producto")
+    st.dataframe(
+        por_producto.drop(columns=["producto_id"]).rename(columns=COLUMNAS),
+        use_container_width=True, hide_index=True
+    )
+with tabla_col2:
+    st.markdown("### Por cliente")
+    st.caption("Una cotización con partidas Minorista y Mayorista cuenta en los dos renglones del cliente.")
+    st.dataframe(por_cliente.rename(columns=COLUMNAS), use_container_width=True, hide_index=True)
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+# Archivo: pages/Simulador_de_Margenes.py
+
+import streamlit as st
+import pandas as pd
+from datetime import date, timedelta
+
+from catalogo_web import cargar_productos
+from historial_ventas import cajas_por_producto
+from simulador_margenes import barrido_margenes, simular_margenes
+
+st.set_page_config(page_title="Simulador de Márgenes", layout="wide")
+
+st.title("🧮 Simulador de Márgenes")
+st.caption("Barre un rango de márgenes de mayoreo y encuentra el mejor margen por producto respecto al PVPS por caja.")
+
+catalogo = cargar_productos()
+if not catalogo:
+    st.stop()
+
+# --- Parámetros ---
+param_col1, param_col2 = st.columns(2)
+with param_col1:
+    margen_min, margen_max = st.slider("Rango de Margen (%):", 0.0, 150.0, (0.0, 60.0), step=1.0)
+    paso = st.number_input("Paso (%):", min_value=0.1, value=0.5, step=0.1)
+with param_col2:
+    fraccion_pvps = st.slider("Precio mayorista máximo (% del PVPS):", 50, 100, 85) / 100
+    bajo_minorista = st.checkbox("No superar el precio minorista", value=True)
+
+origen = st.radio("Productos a simular:", ["Todo el catálogo", "Cotizaciones históricas"], horizontal=True)
+cajas = None
+if origen == "Cotizaciones históricas":
+    rango = st.date_input("Periodo:", value=(date.today() - timedelta(days=90), date.today()))
+    if not isinstance(rango, tuple) or len(rango) != 2:
+        st.info("Selecciona la fecha inicial y la final del periodo.")
+        st.stop()
+    desde, hasta = (d.strftime("%Y-%m-%d") for d in rango)
+    cajas = cajas_por_producto(desde, hasta, tipo_precio="Mayorista")
+    if not cajas:
+        st.info("No hay cotizaciones de mayoreo registradas en este periodo.")
+        st.stop()
+
+if st.button("Simular", type="primary"):
+    margenes = barrido_margenes(margen_min, margen_max, paso)
+    resultados = simular_margenes(
+        list(catalogo), margenes, cajas_por_producto=cajas,
+        max_fraccion_pvps=fraccion_pvps, bajo_minorista=bajo_minorista
+    )
+    df = pd.DataFrame(resultados).rename(columns={
+        "id": "ID", "nombre": "Producto", "margen_optimo": "Margen Óptimo (%)",
+        "precio_mayorista": "P. Mayorista", "distancia_pvps": "Distancia a PVPS",
+        "utilidad_caja": "Utilidad por Caja", "cajas": "Cajas", "utilidad_total": "Utilidad Total"
+    })
+    if cajas is None:
+        df = df.drop(columns=["Cajas", "Utilidad Total"])
+
+    sin_solucion = df["Margen Óptimo (%)"].isna().sum()
+    st.success(f"{len(df):,} productos × {len(margenes)} márgenes simulados.")
+    if sin_solucion:
+        st.warning(f"{sin_solucion:,} productos no tienen un margen que cumpla las restricciones.")
+    st.dataframe(df, use_container_width=True, hide_index=True)
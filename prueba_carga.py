@@ -0,0 +1,529 @@
+# -*- coding: utf-8 -*-
+# Archivo: prueba_carga.py
+#
+# Prueba de carga local de calculadora_web.py. Cada sesión simulada actúa como
+# un vendedor: captura el cliente, busca productos, alterna Minorista/Mayorista,
+# agrega partidas, descarga la cotización y a veces la limpia.
+#
+# Modo "servidor" (por omisión): arranca "streamlit run" en un subproceso sobre
+# una copia de la app en un directorio temporal, para que las cotizaciones de la
+# prueba no queden en el historial real. Cada sesión es un cliente sin navegador
+# que habla el protocolo de Streamlit por websocket: manda el estado de sus
+# controles en cada rerun, baja por HTTP el archivo de st.download_button y hace
+# el clic que registra la cotización. Las sesiones corren a la vez, así que se
+# ve dónde deja de escalar un proceso del servidor; CPU y memoria se miden sobre
+# ese proceso (lee /proc, solo Linux). Una descarga que el servidor ya no tiene
+# (404, columna 'fall') y una cotización registrada sin un PDF descargado cuentan
+# como errores; si hubo errores el programa termina con código 1.
+#
+# Modo "apptest": cada sesión es un AppTest de Streamlit en un hilo de este
+# proceso. AppTest usa un runtime global y no admite dos reruns a la vez, así que
+# los reruns se ejecutan de uno en uno; sirve para perfilar el script, no para
+# medir concurrencia. No puede descargar archivos y la CPU y la memoria medidas
+# son las de este proceso.
+#
+# Uso: python prueba_carga.py --sesiones 1 5 10 20 --acciones 30
+#      python prueba_carga.py --modo apptest --sesiones 1 5
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.testing.v1 import AppTest
+
+from exportar_cotizacion import FORMATOS_EXPORTACION
+from historial_ventas import HISTORIAL_DB
+
+SCRIPT_WEB = "calculadora_web.py"
+_CANDADO_APPTEST = threading.Lock()
+BUSQUEDAS = ["agua", "lourdes", "600", "1.5", "caja 24", "lurdes"]
+BOTONES_EXPORTACION = [f"Descargar {etiqueta}" for etiqueta, _mime in FORMATOS_EXPORTACION.values()]
+# Estado local que no se copia al directorio del servidor de prueba; la app lo regenera.
+_NO_COPIAR = shutil.ignore_patterns(".git", "__pycache__", "static", "historial_ventas.db*", "*.catalogo", "*.tmp")
+
+
+def _memoria_mb(pid="self"):
+    """RSS actual del proceso en MB (Linux); en otros sistemas, el máximo alcanzado por este proceso."""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        import resource
+        maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maximo / 2**20 if sys.platform == "darwin" else maximo / 2**10
+
+
+def _cpu_segundos(pid):
+    """Tiempo de CPU (usuario + sistema) consumido por otro proceso, leído de /proc."""
+    with open(f"/proc/{pid}/stat") as f:
+        datos = f.read()
+    # El nombre del proceso va entre paréntesis y puede tener espacios; utime y stime son los campos 14 y 15.
+    campos = datos[datos.rindex(")") + 2:].split()
+    return (int(campos[11]) + int(campos[12])) / os.sysconf("SC_CLK_TCK")
+
+
+class Monitor:
+    """Muestrea el uso de CPU y memoria de un proceso (por omisión, este) mientras corre la prueba."""
+
+    def __init__(self, pid=None, intervalo=0.2):
+        self.pid = pid
+        self.intervalo = intervalo
+        self.muestras_mb = []
+        self._alto = threading.Event()
+        self._hilo = threading.Thread(target=self._muestrear, daemon=True)
+
+    def _cpu(self):
+        return time.process_time() if self.pid is None else _cpu_segundos(self.pid)
+
+    def _memoria(self):
+        return _memoria_mb(self.pid or "self")
+
+    def _muestrear(self):
+        while not self._alto.wait(self.intervalo):
+            self.muestras_mb.append(self._memoria())
+
+    def __enter__(self):
+        self._inicio = (time.perf_counter(), self._cpu())
+        self.muestras_mb.append(self._memoria())
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *_):
+        self._alto.set()
+        self._hilo.join()
+        self.muestras_mb.append(self._memoria())
+        self.segundos = time.perf_counter() - self._inicio[0]
+        # Proporción de un núcleo: puede pasar de 100% si el código nativo libera el GIL.
+        self.cpu = (self._cpu() - self._inicio[1]) / self.segundos if self.segundos else 0.0
+
+
+def _widget(elementos, etiqueta):
+    for w in elementos:
+        if w.label == etiqueta:
+            return w
+    raise LookupError(f"No se encontró el control '{etiqueta}' en la app.")
+
+
+def simular_sesion(num_sesion, acciones, semilla, timeout):
+    """Ejecuta una sesión de vendedor y regresa (latencias en segundos, número de errores)."""
+    rng = random.Random(semilla * 1000 + num_sesion)
+    latencias = []
+    errores = 0
+    at = AppTest.from_file(SCRIPT_WEB, default_timeout=timeout)
+
+    def rerun():
+        nonlocal errores
+        inicio = time.perf_counter()
+        with _CANDADO_APPTEST:
+            at.run()
+        latencias.append(time.perf_counter() - inicio)
+        errores += len(at.exception)
+
+    rerun()
+    _widget(at.text_input, "Nombre del Cliente").set_value(f"Cliente {num_sesion}")
+    rerun()
+
+    for num_accion in range(acciones):
+        if num_accion % 5 == 0:
+            _widget(at.text_input, "Buscar producto:").set_value(rng.choice(BUSQUEDAS + [""]))
+            rerun()
+        if not at.selectbox:
+            # La búsqueda no encontró productos; se limpia para seguir cotizando.
+            _widget(at.text_input, "Buscar producto:").set_value("")
+            rerun()
+        selector = _widget(at.selectbox, "Producto:")
+        selector.select_index(rng.randrange(len(selector.options)))
+        rerun()
+
+        tipo_precio = rng.choice(["Minorista", "Mayorista"])
+        radio = _widget(at.radio, "Tipo de Precio:")
+        if radio.value != tipo_precio:
+            radio.set_value(tipo_precio)
+            rerun()
+        if tipo_precio == "Mayorista":
+            _widget(at.number_input, "Margen de Ganancia (%):").set_value(float(rng.randint(5, 40)))
+            rerun()
+
+        _widget(at.button, "Agregar a la Cotización").click()
+        rerun()
+
+        if rng.random() < 0.05:
+            _widget(at.button, "Limpiar Cotización").click()
+            rerun()
+
+    return latencias, errores
+
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class ServidorStreamlit:
+    """Ejecuta 'streamlit run' en un subproceso sobre una copia temporal de la app."""
+
+    def __init__(self, script=SCRIPT_WEB, timeout=60):
+        self.script = script
+        self.timeout = timeout
+
+    def __enter__(self):
+        self._directorio = tempfile.TemporaryDirectory(prefix="prueba_carga_")
+        self.directorio = self._directorio.name
+        shutil.copytree(os.getcwd(), self.directorio, ignore=_NO_COPIAR, dirs_exist_ok=True)
+        self.puerto = _puerto_libre()
+        self.direccion = f"127.0.0.1:{self.puerto}"
+        self._log = open(os.path.join(self.directorio, "servidor.log"), "wb")
+        self.proceso = subprocess.Popen(
+            [sys.executable, "-m", "streamlit", "run", self.script,
+             "--server.address", "127.0.0.1", "--server.port", str(self.puerto),
+             "--server.headless", "true", "--server.fileWatcherType", "none",
+             "--browser.gatherUsageStats", "false"],
+            cwd=self.directorio, stdout=self._log, stderr=subprocess.STDOUT
+        )
+        self.pid = self.proceso.pid
+        try:
+            self._esperar_arranque()
+        except BaseException:
+            self.__exit__(None, None, None)
+            raise
+        return self
+
+    def _esperar_arranque(self):
+        limite = time.monotonic() + self.timeout
+        while time.monotonic() < limite:
+            if self.proceso.poll() is not None:
+                with open(os.path.join(self.directorio, "servidor.log"), encoding="utf-8", errors="replace") as f:
+                    raise RuntimeError(f"El servidor de Streamlit terminó al arrancar:\n{f.read()[-2000:]}")
+            try:
+                with urllib.request.urlopen(f"http://{self.direccion}/_stcore/health", timeout=1) as r:
+                    if r.status == 200:
+                        return
+            except OSError:
+                time.sleep(0.2)
+        raise TimeoutError(f"El servidor de Streamlit no respondió en {self.timeout:.0f} s.")
+
+    def cotizaciones_registradas(self):
+        ruta = os.path.join(self.directorio, HISTORIAL_DB)
+        if not os.path.exists(ruta):
+            return 0
+        conn = sqlite3.connect(ruta)
+        try:
+            return conn.execute("SELECT COUNT(*) FROM cotizaciones").fetchone()[0]
+        except sqlite3.OperationalError:
+            return 0
+        finally:
+            conn.close()
+
+    def __exit__(self, *_):
+        self.proceso.terminate()
+        try:
+            self.proceso.wait(10)
+        except subprocess.TimeoutExpired:
+            self.proceso.kill()
+            self.proceso.wait()
+        self._log.close()
+        self._directorio.cleanup()
+
+
+def _bajar(url, timeout):
+    with urllib.request.urlopen(url, timeout=timeout) as r:
+        return len(r.read())
+
+
+class SesionRemota:
+    """Una pestaña del navegador conectada al servidor. Como el frontend de Streamlit, guarda el
+    valor de cada control y los manda todos en cada rerun; los controles se identifican por etiqueta."""
+
+    def __init__(self, ws, direccion, timeout):
+        self.ws = ws
+        self.direccion = direccion
+        self.timeout = timeout
+        self.session_id = ""
+        self.controles = {}
+        self.valores = {}
+        self.errores = 0
+        self._solicitudes = 0
+
+    async def _recibir(self):
+        msg = ForwardMsg()
+        msg.ParseFromString(await asyncio.wait_for(self.ws.recv(), self.timeout))
+        return msg
+
+    def fijar(self, etiqueta, campo, valor):
+        """Cambia el valor de un control; regresa False si ya tenía ese valor."""
+        if self.valores.get(etiqueta) == (campo, valor):
+            return False
+        self.valores[etiqueta] = (campo, valor)
+        return True
+
+    def olvidar(self, etiqueta):
+        self.valores.pop(etiqueta, None)
+
+    async def rerun(self, clic=None):
+        """Manda el estado de los controles (y el clic en el botón 'clic') y espera a que termine el script."""
+        msg = BackMsg()
+        estado = msg.rerun_script
+        estado.SetInParent()
+        for etiqueta, (campo, valor) in self.valores.items():
+            if etiqueta in self.controles:
+                widget = estado.widget_states.widgets.add(id=self.controles[etiqueta].id)
+                setattr(widget, campo, valor)
+        if clic is not None:
+            estado.widget_states.widgets.add(id=self.controles[clic].id, trigger_value=True)
+        await self.ws.send(msg.SerializeToString())
+
+        controles = {}
+        while True:
+            msg = await self._recibir()
+            tipo = msg.WhichOneof("type")
+            if tipo == "new_session":
+                self.session_id = msg.new_session.initialize.session_id
+            elif tipo == "delta" and msg.delta.WhichOneof("type") == "new_element":
+                elemento = msg.delta.new_element
+                tipo_elemento = elemento.WhichOneof("type")
+                if tipo_elemento == "exception":
+                    self.errores += 1
+                elif tipo_elemento:
+                    control = getattr(elemento, tipo_elemento)
+                    campos = control.DESCRIPTOR.fields_by_name
+                    if "id" in campos and "label" in campos:
+                        controles[control.label] = control
+            elif tipo == "script_finished" and msg.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                break
+        self.controles = controles
+
+    async def descargar(self, etiqueta):
+        """Baja por HTTP el archivo del botón de descarga (si es diferido, antes lo pide para que se
+        genere) y regresa los segundos que tardó, o None si el archivo ya no estaba en el servidor.
+        El clic que dispara on_click se manda aparte con rerun()."""
+        boton = self.controles[etiqueta]
+        inicio = time.perf_counter()
+        ruta = boton.url
+        if boton.deferred_file_id:
+            self._solicitudes += 1
+            msg = BackMsg()
+            solicitud = msg.backend_operation_request
+            solicitud.request_id = str(self._solicitudes)
+            solicitud.session_id = self.session_id
+            solicitud.deferred_file.file_id = boton.deferred_file_id
+            await self.ws.send(msg.SerializeToString())
+            while True:
+                msg = await self._recibir()
+                if (msg.WhichOneof("type") == "backend_operation_response"
+                        and msg.backend_operation_response.request_id == solicitud.request_id):
+                    break
+            respuesta = msg.backend_operation_response
+            if respuesta.error_msg:
+                raise RuntimeError(f"No se pudo generar '{etiqueta}': {respuesta.error_msg}")
+            ruta = respuesta.deferred_file.url
+        try:
+            await asyncio.to_thread(_bajar, f"http://{self.direccion}{ruta}", self.timeout)
+        except urllib.error.HTTPError as e:
+            # El navegador mostraría una descarga fallida; quien llama la cuenta como error.
+            if e.code == 404:
+                return None
+            raise
+        return time.perf_counter() - inicio
+
+
+async def simular_sesion_remota(num_sesion, acciones, semilla, timeout, direccion):
+    """Ejecuta una sesión de vendedor contra el servidor y regresa (latencias de rerun,
+    latencias de descarga, descargas fallidas, PDF descargados, número de errores).
+    Las descargas fallidas ya van incluidas en los errores."""
+    rng = random.Random(semilla * 1000 + num_sesion)
+    latencias = []
+    descargas = []
+    fallidas = 0
+    pdfs = 0
+    errores = 0
+
+    async with websockets.connect(f"ws://{direccion}/_stcore/stream", subprotocols=["streamlit"],
+                                  max_size=None) as ws:
+        sesion = SesionRemota(ws, direccion, timeout)
+
+        async def rerun(clic=None):
+            inicio = time.perf_counter()
+            await sesion.rerun(clic)
+            latencias.append(time.perf_counter() - inicio)
+
+        async def descargar(etiqueta):
+            nonlocal fallidas, pdfs
+            duracion = await sesion.descargar(etiqueta)
+            if duracion is None:
+                print(f"Advertencia: la sesión {num_sesion} no pudo bajar '{etiqueta}' (404).", file=sys.stderr)
+                fallidas += 1
+            else:
+                descargas.append(duracion)
+                pdfs += etiqueta == "Descargar PDF"
+            await rerun(clic=etiqueta)
+
+        try:
+            await rerun()
+            sesion.fijar("Nombre del Cliente", "string_value", f"Cliente {num_sesion}")
+            await rerun()
+
+            for num_accion in range(acciones):
+                if num_accion % 5 == 0:
+                    if sesion.fijar("Buscar producto:", "string_value", rng.choice(BUSQUEDAS + [""])):
+                        sesion.olvidar("Producto:")
+                        await rerun()
+                if "Producto:" not in sesion.controles:
+                    # La búsqueda no encontró productos; se limpia para seguir cotizando.
+                    sesion.fijar("Buscar producto:", "string_value", "")
+                    await rerun()
+                sesion.fijar("Producto:", "string_value", rng.choice(sesion.controles["Producto:"].options))
+                await rerun()
+
+                tipo_precio = rng.choice(["Minorista", "Mayorista"])
+                if sesion.fijar("Tipo de Precio:", "string_value", tipo_precio):
+                    await rerun()
+                if tipo_precio == "Mayorista":
+                    sesion.fijar("Margen de Ganancia (%):", "double_value", float(rng.randint(5, 40)))
+                    await rerun()
+
+                await rerun(clic="Agregar a la Cotización")
+
+                if rng.random() < 0.1:
+                    await descargar("Descargar PDF" if rng.random() < 0.7 else rng.choice(BOTONES_EXPORTACION))
+                if rng.random() < 0.05:
+                    await rerun(clic="Limpiar Cotización")
+
+            # Al terminar, cada vendedor descarga su cotización en PDF (y queda registrada).
+            if "Descargar PDF" in sesion.controles:
+                await descargar("Descargar PDF")
+        except (websockets.ConnectionClosed, asyncio.TimeoutError, OSError, KeyError, RuntimeError) as e:
+            print(f"Advertencia: la sesión {num_sesion} terminó antes de tiempo: {e!r}", file=sys.stderr)
+            errores += 1
+
+    return latencias, descargas, fallidas, pdfs, errores + fallidas + sesion.errores
+
+
+async def _correr_sesiones(sesiones, acciones, semilla, timeout, direccion):
+    return await asyncio.gather(*(
+        simular_sesion_remota(n, acciones, semilla, timeout, direccion) for n in range(sesiones)
+    ))
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    if not ordenados:
+        return 0.0
+    k = (len(ordenados) - 1) * p / 100
+    bajo = int(k)
+    alto = min(bajo + 1, len(ordenados) - 1)
+    return ordenados[bajo] + (ordenados[alto] - ordenados[bajo]) * (k - bajo)
+
+
+def _resumen(sesiones, latencias, descargas, errores, monitor, fallidas=0, registradas=0):
+    return {
+        "sesiones": sesiones,
+        "reruns": len(latencias),
+        "errores": errores,
+        "p50_ms": percentil(latencias, 50) * 1000,
+        "p95_ms": percentil(latencias, 95) * 1000,
+        "p99_ms": percentil(latencias, 99) * 1000,
+        "media_ms": statistics.fmean(latencias) * 1000 if latencias else 0.0,
+        "reruns_por_s": len(latencias) / monitor.segundos if monitor.segundos else 0.0,
+        "descargas": len(descargas),
+        "descarga_p95_ms": percentil(descargas, 95) * 1000,
+        "descargas_fallidas": fallidas,
+        "registradas": registradas,
+        "cpu": monitor.cpu,
+        "memoria_max_mb": max(monitor.muestras_mb),
+        "segundos": monitor.segundos,
+    }
+
+
+def correr_escenario(sesiones, acciones, semilla=0, timeout=60):
+    """Escenario en modo apptest: sesiones en hilos de este proceso, con los reruns serializados."""
+    with Monitor() as monitor:
+        with ThreadPoolExecutor(max_workers=sesiones) as executor:
+            resultados = list(executor.map(
+                lambda n: simular_sesion(n, acciones, semilla, timeout), range(sesiones)
+            ))
+    latencias = [l for lat, _err in resultados for l in lat]
+    return _resumen(sesiones, latencias, [], sum(err for _lat, err in resultados), monitor)
+
+
+def correr_escenario_servidor(sesiones, acciones, semilla=0, timeout=60, script=SCRIPT_WEB):
+    """Escenario en modo servidor: un 'streamlit run' nuevo y sesiones websocket concurrentes.
+    CPU y memoria son las del proceso del servidor."""
+    with ServidorStreamlit(script, timeout) as servidor:
+        # Una primera visita fuera de la medición compila el catálogo y genera las variantes de imágenes.
+        asyncio.run(_correr_sesiones(1, 0, semilla, timeout, servidor.direccion))
+        registradas_antes = servidor.cotizaciones_registradas()
+        with Monitor(servidor.pid) as monitor:
+            resultados = asyncio.run(_correr_sesiones(sesiones, acciones, semilla, timeout, servidor.direccion))
+        registradas = servidor.cotizaciones_registradas() - registradas_antes
+    latencias = [l for lat, *_resto in resultados for l in lat]
+    descargas = [d for _lat, desc, *_resto in resultados for d in desc]
+    errores = sum(r[4] for r in resultados)
+    pdfs = sum(r[3] for r in resultados)
+    # Cada folio se registra una sola vez, así que nunca debe haber más registros que PDF bajados.
+    if registradas > pdfs:
+        print(f"Advertencia: {registradas} cotizaciones registradas y solo {pdfs} PDF descargados.", file=sys.stderr)
+        errores += registradas - pdfs
+    return _resumen(sesiones, latencias, descargas, errores, monitor, sum(r[2] for r in resultados), registradas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga de calculadora_web.py con sesiones simuladas.")
+    parser.add_argument("--modo", choices=["servidor", "apptest"], default="servidor",
+                        help="servidor: streamlit run con clientes websocket concurrentes; "
+                             "apptest: AppTest en este proceso, con reruns serializados")
+    parser.add_argument("--sesiones", type=int, nargs="+", default=[1, 5, 10, 20],
+                        help="número de sesiones concurrentes de cada escenario")
+    parser.add_argument("--acciones", type=int, default=20, help="productos que agrega cada sesión")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=60, help="tiempo máximo por rerun, en segundos")
+    parser.add_argument("--script", default=SCRIPT_WEB,
+                        help="script que ejecuta el servidor en modo servidor (por ejemplo servidor_web.py)")
+    parser.add_argument("--salida", help="archivo JSON donde guardar los resultados")
+    args = parser.parse_args()
+
+    # La app usa rutas relativas (productos.json, logo.png, static/).
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    if args.modo == "servidor" and not os.path.exists("/proc/self/stat"):
+        parser.error("el modo servidor mide el proceso del servidor en /proc; en este sistema usa --modo apptest")
+
+    print(f"{'sesiones':>8} {'reruns':>7} {'err':>4} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'reruns/s':>9} {'desc':>5} {'fall':>5} {'desc p95':>9} {'reg':>4} {'CPU':>6} {'RSS MB':>8}")
+    resultados = []
+    for sesiones in args.sesiones:
+        if args.modo == "servidor":
+            r = correr_escenario_servidor(sesiones, args.acciones, args.semilla, args.timeout, args.script)
+        else:
+            r = correr_escenario(sesiones, args.acciones, args.semilla, args.timeout)
+        r["modo"] = args.modo
+        resultados.append(r)
+        print(f"{r['sesiones']:>8} {r['reruns']:>7} {r['errores']:>4} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+              f"{r['p99_ms']:>8.1f} {r['reruns_por_s']:>9.1f} {r['descargas']:>5} {r['descargas_fallidas']:>5} {r['descarga_p95_ms']:>9.1f} "
+              f"{r['registradas']:>4} {r['cpu']:>6.0%} {r['memoria_max_mb']:>8.1f}")
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=4, ensure_ascii=False)
+    # Para usarla en integración continua: una corrida con errores no debe pasar por buena.
+    return 1 if any(r["errores"] for r in resultados) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+# Archivo: recursos_graficos.py
+#
+# Variantes pre-escaladas y comprimidas de las imágenes de la interfaz. Cada
+# variante se genera una vez en STATIC_DIR y sus bytes quedan en caché en el
+# proceso, así que ni la app web ni la de escritorio vuelven a decodificar y
+# re-escalar los PNG originales en cada uso.
+
+import functools
+import hashlib
+import io
+import os
+import threading
+
+from PIL import Image
+from reportlab.lib.utils import ImageReader
+
+STATIC_DIR = "static"
+# Ruta con la que Streamlit sirve STATIC_DIR (requiere server.enableStaticServing).
+STATIC_URL = "app/static"
+
+# Tamaños (caja ancho x alto, en px; None = sin límite) que usa cada pantalla, incluyendo 2x para HiDPI.
+VARIANTES = {
+    "logo.png": [(250, None), (250, 80), (500, 160), (300, 300)],
+    "config_icon.png": [(20, 20), (40, 40)],
+    "truck_icon.png": [(20, 20), (40, 40)],
+    "add_icon.png": [(18, 18), (36, 36)],
+    "clear_icon.png": [(18, 18), (36, 36)],
+    "pdf_icon.png": [(18, 18), (36, 36)],
+}
+LOGO_PDF = ("logo.png", 300, 300)
+
+
+def _nombre_variante(nombre, ancho, alto):
+    base, ext = os.path.splitext(os.path.basename(nombre))
+    return f"{base}_{ancho}x{alto or 'auto'}{ext}"
+
+
+@functools.lru_cache(maxsize=64)
+def _variante(nombre, ancho, alto, mtime_ns):
+    # mtime_ns forma parte de la llave para que un PNG reemplazado genere variantes nuevas.
+    ruta = os.path.join(STATIC_DIR, _nombre_variante(nombre, ancho, alto))
+    try:
+        vigente = os.stat(ruta).st_mtime_ns >= mtime_ns
+    except FileNotFoundError:
+        vigente = False
+    if not vigente:
+        os.makedirs(STATIC_DIR, exist_ok=True)
+        with Image.open(nombre) as imagen:
+            imagen.load()
+            imagen.thumbnail((ancho, alto or imagen.height), Image.Resampling.LANCZOS)
+            imagen = imagen.convert("RGBA")
+            # El re-escalado genera miles de colores intermedios; con paleta de 256 (con alfa) el logo
+            # queda en menos de la mitad. En íconos diminutos la paleta puede salir más pesada.
+            candidatos = []
+            for version in (imagen, imagen.quantize(256, method=Image.Quantize.FASTOCTREE)):
+                buffer = io.BytesIO()
+                version.save(buffer, format="PNG", optimize=True)
+                candidatos.append(buffer.getvalue())
+        # lru_cache no impide que dos hilos generen la misma variante a la vez; cada uno usa su temporal.
+        tmp = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(min(candidatos, key=len))
+        os.replace(tmp, ruta)
+    with open(ruta, "rb") as f:
+        datos = f.read()
+    return ruta, datos, hashlib.sha1(datos).hexdigest()[:12]
+
+
+def variante(nombre, ancho, alto=None):
+    """Regresa (ruta, bytes, versión) de la imagen escalada para caber en ancho x alto.
+    Lanza FileNotFoundError si la imagen original no existe."""
+    return _variante(nombre, ancho, alto, os.stat(nombre).st_mtime_ns)
+
+
+def ruta_variante(nombre, ancho, alto=None):
+    return variante(nombre, ancho, alto)[0]
+
+
+def url_variante(nombre, ancho, alto=None):
+    """URL estable de la variante servida como archivo estático. El parámetro 'v' cambia solo
+    cuando cambia el contenido. Streamlit no manda Cache-Control en app/static, así que el
+    navegador revalida con ETag; servidor_web.py marca estas URL como inmutables."""
+    ruta, _datos, version = variante(nombre, ancho, alto)
+    return f"{STATIC_URL}/{os.path.basename(ruta)}?v={version}"
+
+
+@functools.lru_cache(maxsize=4)
+def _lector_imagen(ruta, version):
+    return ImageReader(ruta)
+
+
+def lector_logo_pdf():
+    """ImageReader del logo para los PDF; se decodifica una sola vez por versión del archivo."""
+    ruta, _datos, version = variante(*LOGO_PDF)
+    return _lector_imagen(ruta, version)
+
+
+def dibujar_logo_pdf(c, derecha, abajo, alto):
+    """Dibuja el logo en un canvas de ReportLab alineado a la derecha. Si falta el archivo no dibuja nada."""
+    try:
+        logo = lector_logo_pdf()
+    except OSError:
+        return
+    ancho_px, alto_px = logo.getSize()
+    ancho = alto * ancho_px / alto_px
+    c.drawImage(logo, derecha - ancho, abajo, width=ancho, height=alto, mask="auto")
+
+
+def generar_variantes():
+    """Genera todas las variantes de VARIANTES; regresa las rutas de las que se pudieron crear."""
+    rutas = []
+    for nombre, tamanos in VARIANTES.items():
+        for ancho, alto in tamanos:
+            try:
+                rutas.append(ruta_variante(nombre, ancho, alto))
+            except FileNotFoundError:
+                print(f"Advertencia: No se encontró '{nombre}'.")
+    return rutas
+
+
+if __name__ == "__main__":
+    # Uso: python recursos_graficos.py  (pre-genera las variantes, por ejemplo al desplegar)
+    for ruta in generar_variantes():
+        print(f"{ruta}: {os.path.getsize(ruta):,} bytes")
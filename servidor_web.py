@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+# Archivo: servidor_web.py
+#
+# Punto de entrada ASGI de la app web con encabezados de caché para las
+# variantes de imágenes. Streamlit sirve app/static/ sin Cache-Control (el
+# navegador solo revalida con ETag/Last-Modified); las URL de url_variante
+# llevan la versión del contenido en '?v=', así que se pueden marcar como
+# inmutables y el navegador ya no vuelve a pedirlas.
+#
+# Uso: streamlit run servidor_web.py   (o: uvicorn servidor_web:app --port 8501)
+# Con "streamlit run calculadora_web.py" la app funciona igual, sin estos encabezados.
+
+import streamlit as st
+from starlette.middleware import Middleware
+
+from recursos_graficos import STATIC_URL
+
+# Un año: el máximo que respetan los navegadores.
+MAX_AGE_VARIANTES = 365 * 24 * 3600
+
+
+class CacheVariantes:
+    """Middleware ASGI que agrega Cache-Control inmutable a las respuestas de STATIC_URL
+    pedidas con versión ('?v=...'). Las peticiones sin versión quedan como las deja Streamlit."""
+
+    def __init__(self, app, max_age=MAX_AGE_VARIANTES):
+        self.app = app
+        self.encabezado = f"public, max-age={max_age}, immutable".encode("latin-1")
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or f"/{STATIC_URL}/" not in scope["path"]
+                or not scope.get("query_string", b"").startswith(b"v=")):
+            await self.app(scope, receive, send)
+            return
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start" and mensaje["status"] in (200, 304):
+                encabezados = [(k, v) for k, v in mensaje.get("headers", []) if k.lower() != b"cache-control"]
+                encabezados.append((b"cache-control", self.encabezado))
+                mensaje = {**mensaje, "headers": encabezados}
+            await send(mensaje)
+
+        await self.app(scope, receive, enviar)
+
+
+app = st.App("calculadora_web.py", middleware=[Middleware(CacheVariantes)])
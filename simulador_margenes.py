@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+# Archivo: simulador_margenes.py
+#
+# Simulación de márgenes de mayoreo para todo el catálogo. Para cada producto y
+# cada margen del barrido calcula el precio mayorista, la distancia al precio
+# sugerido de venta al público por caja (pvps_caja) y la utilidad por caja, y
+# elige el mayor margen que cumple las restricciones.
+
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+IVA_FACTOR = 1.16
+PRODUCTOS_POR_LOTE = 20000
+# Con menos productos el cálculo vectorizado tarda menos que arrancar un proceso.
+PRODUCTOS_MIN_PARALELO = 50000
+
+
+def barrido_margenes(minimo=0.0, maximo=60.0, paso=0.5):
+    """Márgenes (%) a evaluar, incluyendo ambos extremos."""
+    return np.round(np.arange(minimo, maximo + paso / 2, paso), 6)
+
+
+def _simular_lote(costo, pvps, minorista, cajas, margenes, max_fraccion_pvps, bajo_minorista):
+    # Misma fórmula que el precio mayorista de la calculadora, para todo el lote a la vez.
+    precios = (costo[:, None] / IVA_FACTOR) * (1 + margenes[None, :] / 100) * IVA_FACTOR
+    factible = precios <= (pvps * max_fraccion_pvps)[:, None]
+    if bajo_minorista:
+        factible &= precios <= minorista[:, None]
+
+    # La utilidad crece con el margen, así que el mejor es el último margen factible.
+    hay_solucion = factible.any(axis=1)
+    mejor = factible.shape[1] - 1 - np.argmax(factible[:, ::-1], axis=1)
+    filas = np.arange(len(costo))
+    precio = precios[filas, mejor]
+    utilidad_caja = (precio - costo) / IVA_FACTOR
+    return (
+        np.where(hay_solucion, margenes[mejor], np.nan),
+        np.where(hay_solucion, precio, np.nan),
+        np.where(hay_solucion, pvps - precio, np.nan),
+        np.where(hay_solucion, utilidad_caja, np.nan),
+        np.where(hay_solucion, utilidad_caja * cajas, np.nan),
+    )
+
+
+def simular_margenes(productos, margenes=None, cajas_por_producto=None, max_fraccion_pvps=1.0,
+                     bajo_minorista=True, procesos=None):
+    """Barre los márgenes para todos los productos y regresa el mejor margen de cada uno.
+
+    - cajas_por_producto: {id: cajas} de cotizaciones históricas; si se indica, solo se simulan
+      esos productos y la utilidad total se pondera por esas cajas.
+    - max_fraccion_pvps: el precio mayorista no puede pasar de esta fracción de pvps_caja
+      (por ejemplo 0.85 deja al menos 15% para el minorista).
+    - bajo_minorista: el precio mayorista no puede ser mayor que el precio minorista.
+
+    Los productos sin margen factible se regresan con margen_optimo en None.
+    """
+    margenes = barrido_margenes() if margenes is None else np.asarray(margenes, dtype=float)
+    if cajas_por_producto is not None:
+        productos = [p for p in productos if p["id"] in cajas_por_producto]
+    n = len(productos)
+    if n == 0:
+        return []
+
+    costo = np.fromiter((p["costo_distribuidor_iva"] for p in productos), float, n)
+    pvps = np.fromiter((p["pvps_caja"] for p in productos), float, n)
+    minorista = np.fromiter((p["precio_minorista_iva"] for p in productos), float, n)
+    cajas = np.fromiter(
+        ((cajas_por_producto or {}).get(p["id"], 1) for p in productos), float, n
+    )
+
+    lotes = [
+        (costo[i:i + PRODUCTOS_POR_LOTE], pvps[i:i + PRODUCTOS_POR_LOTE], minorista[i:i + PRODUCTOS_POR_LOTE],
+         cajas[i:i + PRODUCTOS_POR_LOTE], margenes, max_fraccion_pvps, bajo_minorista)
+        for i in range(0, n, PRODUCTOS_POR_LOTE)
+    ]
+    if procesos is None:
+        procesos = min(len(lotes), os.cpu_count() or 1) if n >= PRODUCTOS_MIN_PARALELO else 1
+    if procesos <= 1 or len(lotes) <= 1:
+        resultados = [_simular_lote(*lote) for lote in lotes]
+    else:
+        # "spawn" y no fork: dentro de Streamlit el proceso tiene varios hilos y un fork puede quedar bloqueado.
+        with ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context("spawn")) as executor:
+            resultados = list(executor.map(_simular_lote, *zip(*lotes)))
+    margen, precio, distancia, utilidad_caja, utilidad_total = (
+        np.concatenate(columna) for columna in zip(*resultados)
+    )
+
+    def valor(x):
+        return None if np.isnan(x) else float(x)
+
+    return [
+        {
+            "id": p["id"],
+            "nombre": p["nombre"],
+            "margen_optimo": valor(margen[i]),
+            "precio_mayorista": valor(precio[i]),
+            "distancia_pvps": valor(distancia[i]),
+            "utilidad_caja": valor(utilidad_caja[i]),
+            "cajas": float(cajas[i]) if cajas_por_producto is not None else None,
+            "utilidad_total": valor(utilidad_total[i]) if cajas_por_producto is not None else None,
+        }
+        for i, p in enumerate(productos)
+    ]
+
+
+if __name__ == "__main__":
+    # Benchmark: python simulador_margenes.py [num_productos ...]
+    rng = np.random.default_rng(0)
+    tamanos = [int(n) for n in sys.argv[1:]] or [1000, 10000, 100000]
+    for num_productos in tamanos:
+        costo = rng.uniform(50, 400, num_productos)
+        productos = [
+            {"id": i, "nombre": f"Producto {i}", "costo_distribuidor_iva": c,
+             "precio_minorista_iva": c * 1.4, "pvps_caja": c * 1.9}
+            for i, c in enumerate(costo)
+        ]
+        inicio = time.perf_counter()
+        resultado = simular_margenes(productos, max_fraccion_pvps=0.85)
+        duracion = time.perf_counter() - inicio
+        print(f"{num_productos:>7} productos x {len(barrido_margenes())} márgenes | {duracion:.3f} s")